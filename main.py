@@ -1,8 +1,13 @@
-from utils.push import FinalVersionManager
+from utils.push import FinalVersionManager, PushStatus
+from utils.plan import show_plan, format_size
+from utils.watch import start_watcher
+from utils.metrics import record_run, set_outcome
+import os
 import questionary
+import argparse
 import re
 import sys
-from typing import Tuple
+from typing import Optional, Tuple
 
 def validate_version(input_version: str, current_version: Tuple[int, int, int, int]) -> bool:
     """简化版验证，只返回布尔值"""
@@ -26,14 +31,34 @@ def validate_version(input_version: str, current_version: Tuple[int, int, int, i
     except ValueError:
         return False
 
-def run():
+@record_run("run")
+def run(plan_only: bool = False, watch: bool = False, scope: Optional[str] = None,
+        force_empty: bool = False):
     print("🔥 终极版本控制系统")
     print("=====================================")
     
-    manager = FinalVersionManager()
+    # 后台监视文件改动，之后的推送只需处理改动过的路径
+    if watch:
+        start_watcher(os.getcwd())
+
+    manager = FinalVersionManager(scope)
     current_display = manager.get_version_display()
     print(f"当前版本: {current_display}")
 
+    # 仅预览推送计划
+    if plan_only:
+        show_plan(manager.plan(), f"dev ({manager.scope})" if manager.scope else "dev")
+        set_outcome("plan")
+        sys.exit(0)
+
+    # 本地与所有远程dev的树哈希相同则无需推送（不产生任何网络写入）
+    plan = manager.plan()
+    unchanged = None if force_empty else manager.unchanged(plan)
+    if unchanged:
+        print("✅ 本地文件与所有远程的dev完全一致，无需推送（如需空提交请使用 --force-empty）")
+        set_outcome("noop")
+        sys.exit(0)
+
     # 简化版输入验证
     base = questionary.text(
         "输入基础版本号:",
@@ -55,12 +80,38 @@ def run():
     
     desc = questionary.text("描述:").ask() or "无描述"
 
+    # 输入期间文件可能有改动，快照可能过期时才重新生成
+    refreshed = manager.refresh(plan)
+    if refreshed != plan:
+        unchanged = None  # 计划已变，前面对各远程的检查结果不再适用
+    plan = refreshed
+
+    # 传输量超过阈值时需要确认
+    if plan.bytes > manager.plan_threshold:
+        print()
+        show_plan(plan, "dev")
+        if not questionary.confirm(f"预估传输 {format_size(plan.bytes)} 超过阈值，确认继续?").ask():
+            print("🚫 操作取消")
+            sys.exit(0)
+
     print("\n💣 正在执行终极推送...")
-    if manager.push_with_power(next_ver, title, desc):
+    status = manager.push_with_power(next_ver, title, desc, force_empty, plan, unchanged)
+    if status is PushStatus.OK:
         print(f"\n✅ 推送成功! 新版本: {next_ver}")
+    elif status is PushStatus.NOOP:
+        print("\n✅ 没有需要推送的变更，未创建新版本")
     else:
         print("\n❌ 推送失败")
         sys.exit(1)
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(
+        description="Git-Go 一键推送",
+        epilog="推送内容遵循所有忽略规则（包括根目录.gitignore），被忽略的文件不会推送"
+    )
+    parser.add_argument("--plan", action="store_true", help="只显示推送计划（变更文件和预估传输量）后退出")
+    parser.add_argument("--watch", action="store_true", help="在后台启动文件监视，加速之后的推送（仅Linux）")
+    parser.add_argument("--path", help="只推送该子目录（monorepo），版本号按子目录独立计算")
+    parser.add_argument("--force-empty", action="store_true", help="本地与所有远程的dev完全一致时仍创建空提交并推送")
+    args = parser.parse_args()
+    run(plan_only=args.plan, watch=args.watch, scope=args.path, force_empty=args.force_empty)
@@ -3,39 +3,39 @@ import questionary
 import re
 import sys
 import tempfile
-import os
+import argparse
 from utils.git_repo import get_repo_info
+from utils.git_runner import run_git_async, run_sync, gather
+from utils.plan import make_plan, show_plan, format_size
+from utils.snapshot import resolve_ref, tree_of
+from utils.scope import normalize_scope, scope_prefix, latest_version_subject, promoted_tree, promote_commit
+from utils.config import load_config
+from utils.remotes import resolve_remotes, push_to_remotes
+from utils.metrics import record_run, phase, add_bytes, set_outcome
 
-def get_remote_branch_version(repo_root, branch):
-    """更可靠地获取远程分支版本号"""
+async def get_remote_branch_version(repo_root, branch, scope=None):
+    """更可靠地获取远程分支版本号（指定scope时取该子目录的版本线）"""
     try:
-        original_dir = os.getcwd()
-        os.chdir(repo_root)
-        
         # 1. 先检查远程分支是否存在
-        remote_refs = subprocess.run(
-            ["git", "ls-remote", "--heads", "origin", branch],
-            capture_output=True, text=True
-        ).stdout.strip()
+        remote_refs = (await run_git_async(
+            "ls-remote", "--heads", "origin", branch, cwd=repo_root
+        )).stdout.strip()
         
         if not remote_refs:
             return None
             
         # 2. 直接从远程获取提交信息（不依赖本地对象）
         commit_hash = remote_refs.split()[0]
-        commit_info = subprocess.run(
-            ["git", "fetch", "origin", f"{branch}:refs/remotes/origin/{branch}", "--quiet"],
-            capture_output=True, text=True
+        await run_git_async(
+            "fetch", "origin", f"{branch}:refs/remotes/origin/{branch}", "--quiet", cwd=repo_root
         )
         
-        # 3. 使用git show获取提交信息（现在本地有对象了）
-        commit_msg = subprocess.run(
-            ["git", "show", "-s", "--format=%B", commit_hash],
-            capture_output=True, text=True
-        ).stdout.strip()
+        # 3. 查找（该子目录）最近一次带版本号的提交（现在本地有对象了）
+        first_line = await latest_version_subject(repo_root, commit_hash, scope)
+        if not first_line:
+            return None
         
         # 4. 提取版本号
-        first_line = commit_msg.split('\n')[0]
         version_match = re.search(r'(v\d+\.\d+\.\d+)(?:-(dev|beta)\.\d+)?', first_line)
         
         return version_match.group(0) if version_match else None
@@ -43,22 +43,80 @@ def get_remote_branch_version(repo_root, branch):
     except Exception as e:
         print(f"⚠️ 获取分支 {branch} 版本时出错: {str(e)}")
         return None
-    finally:
-        os.chdir(original_dir)
 
 
-def promote():
+async def plan_promote(repo_root, from_branch, to_branch, scope=None):
+    """计算复制计划：目标分支将发生的变更（源分支的树远程已有，只需发送新提交）"""
+    from_tip, _ = await gather(
+        resolve_ref(repo_root, f"origin/{from_branch}"),
+        run_git_async("fetch", "origin", f"{to_branch}:refs/remotes/origin/{to_branch}", "--quiet", cwd=repo_root)
+    )
+    from_tree, to_tip = await gather(
+        tree_of(repo_root, from_tip),
+        resolve_ref(repo_root, f"origin/{to_branch}")
+    )
+    new_tree = await promoted_tree(repo_root, from_tree, await tree_of(repo_root, to_tip), scope)
+    return await make_plan(repo_root, new_tree, to_tip, known_trees=(from_tree,))
+
+
+async def copy_branch(repo_info, from_branch, to_branch, commit_message, config, scope=None):
+    """在临时裸仓库中创建全新提交并推送到所有远程，返回 (是否成功, 每个远程的推送结果)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"⚡ 正在克隆裸仓库到临时目录...")
+        # 克隆、获取源分支最新提交、解析推送目标互不依赖，并发执行
+        with phase("clone"):
+            _, remote_ref, remotes = await gather(
+                run_git_async("clone", "--bare", repo_info.remote_url, tmp_dir, check=True),
+                run_git_async("ls-remote", "--heads", repo_info.remote_url, from_branch,
+                              cwd=repo_info.root_path, check=True),
+                resolve_remotes(config["remotes"], repo_info.root_path)
+            )
+        commit_hash = remote_ref.stdout.strip().split()[0]
+        
+        print(f"⚡ 正在创建全新提交...")
+        with phase("commit"):
+            # 创建新提交（只构建一次）：整个分支时是完全独立的新提交，
+            # 指定scope时只把该子目录嫁接到目标分支上，保留其他子目录的版本记录
+            new_commit = await promote_commit(
+                tmp_dir, commit_hash, f"refs/heads/{to_branch}", commit_message, scope
+            )
+            
+            # 更新目标分支引用
+            await run_git_async("update-ref", f"refs/heads/{to_branch}", new_commit, cwd=tmp_dir, check=True)
+        
+        # 强制推送（所有远程并发）
+        refspec = f"refs/heads/{to_branch}:refs/heads/{to_branch}"
+        with phase("push"):
+            return await push_to_remotes(tmp_dir, refspec, remotes, config["remote_policy"])
+
+
+@record_run("promote")
+def promote(plan_only=False, scope=None):
     print("🚀 远程分支复制工具 (不操作本地文件)")
     
     # 获取仓库信息
     repo_info = get_repo_info()
     if not repo_info.is_repo or not repo_info.remote_url:
         print("❌ 当前目录不是Git仓库或没有远程仓库")
+        set_outcome("fail")
         return
+
+    try:
+        scope = normalize_scope(scope, repo_info.root_path)
+        config = load_config()
+    except ValueError as e:
+        print(f"❌ {e}")
+        set_outcome("fail")
+        return
+    if scope:
+        print(f"📁 只复制子目录: {scope}")
     
-    # 获取各分支当前版本
-    dev_version = get_remote_branch_version(repo_info.root_path, "dev")
-    beta_version = get_remote_branch_version(repo_info.root_path, "beta")
+    # 获取各分支当前版本（并发）
+    with phase("fetch"):
+        dev_version, beta_version = run_sync(gather(
+            get_remote_branch_version(repo_info.root_path, "dev", scope),
+            get_remote_branch_version(repo_info.root_path, "beta", scope)
+        ))
     
     # 准备选择项
     choices = []
@@ -85,6 +143,7 @@ def promote():
     
     if not choices:
         print("❌ 没有可用的分支或无法获取版本号")
+        set_outcome("fail")
         return
     
     # 选择复制方向
@@ -95,71 +154,61 @@ def promote():
 
     if not action:
         print("🚫 操作取消")
+        set_outcome("cancel")
         return
 
     from_branch, to_branch, old_version, new_version = action
 
+    # 推送计划
+    try:
+        with phase("discovery"):
+            plan = run_sync(plan_promote(repo_info.root_path, from_branch, to_branch, scope))
+    except (subprocess.SubprocessError, ValueError) as e:
+        print(f"❌ 无法计算复制计划: {e}")
+        set_outcome("fail")
+        return
+    if plan_only:
+        show_plan(plan, to_branch)
+        set_outcome("plan")
+        return
+
     # 确认操作
     print(f"\n🔄 即将执行以下操作：")
     print(f"• 从分支: {from_branch}({old_version})")
     print(f"• 复制到分支: {to_branch}({new_version})")
+    print(f"• 变更文件: {len(plan.changes)} 个, 预估传输约 {format_size(plan.bytes)}")
     if not questionary.confirm("确认继续?").ask():
         print("🚫 操作取消")
+        set_outcome("cancel")
         return
 
     # 执行操作
     try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            print(f"⚡ 正在克隆裸仓库到临时目录...")
-            subprocess.run(
-                ["git", "clone", "--bare", repo_info.remote_url, tmp_dir],
-                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            
-            print(f"⚡ 正在创建全新提交...")
-            # 获取源分支最新提交
-            remote_ref = subprocess.run(
-                ["git", "ls-remote", "--heads", repo_info.remote_url, from_branch],
-                cwd=tmp_dir, capture_output=True, text=True, check=True
-            ).stdout.strip()
-            commit_hash = remote_ref.split()[0]
-            
-            # 创建新的空提交（完全独立的新提交）
-            commit_message = f"{new_version}\n\nupdate from\n{old_version}"
-            subprocess.run(
-                ["git", "commit-tree", "-m", commit_message, commit_hash + "^{tree}"],
-                cwd=tmp_dir, check=True
-            )
-            
-            # 获取新提交的哈希
-            new_commit = subprocess.run(
-                ["git", "rev-parse", "HEAD"],
-                cwd=tmp_dir, capture_output=True, text=True, check=True
-            ).stdout.strip()
-            
-            # 更新目标分支引用
-            subprocess.run(
-                ["git", "update-ref", f"refs/heads/{to_branch}", new_commit],
-                cwd=tmp_dir, check=True
-            )
-            
-            # 强制推送
-            subprocess.run(
-                ["git", "push", "origin", f"refs/heads/{to_branch}:refs/heads/{to_branch}", "--force"],
-                cwd=tmp_dir, check=True
-            )
-            
-            print(f"\n✅ 操作成功完成！")
-            print(f"• 源分支: {from_branch}@{old_version}")
-            print(f"• 目标分支: {to_branch}@{new_version} (全新独立提交)")
-            print(f"• 提交信息:\n{commit_message}")
+        commit_message = f"{scope_prefix(scope)}{new_version}\n\nupdate from\n{old_version}"
+        ok, results = run_sync(copy_branch(repo_info, from_branch, to_branch, commit_message, config, scope))
+        # 与dev推送一致：按实际接收了推送的远程计算传输量
+        add_bytes(plan.bytes * sum(r.ok for r in results))
+        if not ok:
+            print(f"\n❌ 操作失败: 部分远程推送失败")
+            set_outcome("fail")
+            return
+        
+        print(f"\n✅ 操作成功完成！")
+        print(f"• 源分支: {from_branch}@{old_version}")
+        print(f"• 目标分支: {to_branch}@{new_version} ({'基于目标分支的新提交' if scope else '全新独立提交'})")
+        print(f"• 提交信息:\n{commit_message}")
             
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr if isinstance(e.stderr, str) else e.stderr.decode('utf-8') if e.stderr else str(e)
-        print(f"\n❌ 操作失败: {error_msg.strip()}")
+        print(f"\n❌ 操作失败: {(e.stderr or str(e)).strip()}")
+        set_outcome("fail")
     except Exception as e:
         print(f"\n❌ 发生错误: {str(e)}")
+        set_outcome("error")
 
 
 if __name__ == "__main__":
-    promote()
+    parser = argparse.ArgumentParser(description="远程分支复制工具")
+    parser.add_argument("--plan", action="store_true", help="只显示复制计划后退出")
+    parser.add_argument("--path", help="只复制该子目录（monorepo），版本号按子目录独立计算")
+    args = parser.parse_args()
+    promote(plan_only=args.plan, scope=args.path)
@@ -1,6 +1,5 @@
 import os
 import sys
-import subprocess
 import importlib.util
 from pathlib import Path
 from rich.console import Console
@@ -9,13 +8,16 @@ from rich.panel import Panel
 
 console = Console()
 
-def load_module(module_name, module_path):
-    """安全的动态模块加载"""
+def load_module(module_name, module_path, package=False):
+    """安全的动态模块加载（package=True 时按包加载__init__.py，支持相对导入）"""
     module_path = Path(module_path).absolute()
     if not module_path.exists():
         raise ImportError(f"模块文件不存在: {module_path}")
     
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    spec = importlib.util.spec_from_file_location(
+        module_name, module_path,
+        submodule_search_locations=[str(module_path.parent)] if package else None
+    )
     if spec is None:
         raise ImportError(f"无法创建模块规范: {module_path}")
     
@@ -24,23 +26,26 @@ def load_module(module_name, module_path):
     spec.loader.exec_module(module)
     return module
 
-# 动态加载git_repo模块
+# 动态加载utils包（git_repo依赖包内的git_runner）
 current_script_path = Path(__file__).absolute()
 utils_dir = current_script_path.parent.parent / "utils"
-git_repo_path = utils_dir / "git_repo.py"
 
 try:
-    git_repo = load_module("git_repo", git_repo_path)
-    get_repo_info = git_repo.get_repo_info
-    check_remote_connection = git_repo.check_remote_connection
+    load_module("utils", utils_dir / "__init__.py", package=True)
+    git_repo = importlib.import_module("utils.git_repo")
+    git_runner = importlib.import_module("utils.git_runner")
+    get_repo_info_async = git_repo.get_repo_info_async
+    check_remote_connection_async = git_repo.check_remote_connection_async
+    run_git_async, run_sync, gather = git_runner.run_git_async, git_runner.run_sync, git_runner.gather
+    metrics = importlib.import_module("utils.metrics")
 except ImportError as e:
     console.print(f"[red]错误: 无法加载git_repo模块[/]\n{str(e)}")
     sys.exit(1)
 
-def check_git_installed() -> bool:
+async def check_git_installed() -> bool:
     """检查Git是否安装"""
     try:
-        result = subprocess.run(["git", "--version"], capture_output=True, text=True)
+        result = await run_git_async("--version")
         return result.returncode == 0
     except FileNotFoundError:
         return False
@@ -57,20 +62,20 @@ def show_check_result(results: dict):
     
     console.print(table)
 
+@metrics.record_run("check_git")
 def check_git():
     """主检查逻辑"""
     # console.print(Panel.fit("🛠️ Git 基础连接检查工具", style="bold blue")) # 不好看
     results = {}
     
-    # 1. 检查Git安装
-    git_installed = check_git_installed()
+    # 1+2. 检查Git安装与仓库状态（并发）
+    with metrics.phase("discovery"):
+        git_installed, repo_info = run_sync(gather(check_git_installed(), get_repo_info_async()))
     results["Git安装"] = (
         git_installed,
         "已安装" if git_installed else "未安装或未配置PATH"
     )
     
-    # 2. 使用动态加载的模块检查仓库状态
-    repo_info = get_repo_info()
     results["Git仓库"] = (
         repo_info.is_repo,
         str(repo_info.root_path) if repo_info.is_repo else "当前目录不是Git仓库"
@@ -79,7 +84,8 @@ def check_git():
     # 3. 检查远程连接（仅在仓库内检查）
     remote_ok = False
     if repo_info.is_repo:
-        remote_ok = check_remote_connection()
+        with metrics.phase("fetch"):
+            remote_ok = run_sync(check_remote_connection_async(repo_info.root_path))
         results["远程连接"] = (
             remote_ok,
             "连接正常" if remote_ok else "无法连接到远程仓库"
@@ -92,6 +98,8 @@ def check_git():
     
     # 显示结果
     show_check_result(results)
+    if not all(ok for ok, _ in results.values()):
+        metrics.set_outcome("fail")
     console.print("\n[dim]提示: 请确保网络畅通且有仓库访问权限[/]")
 
 if __name__ == "__main__":
@@ -23,13 +23,28 @@ def init_default_config() -> dict:
             "BETA": "beta",
             "DEV": "dev"
         },
-        "force": False  # 唯一新增字段（用户可选的强制模式）
+        "force": False,  # 用户可选的强制模式
+        "remotes": ["origin"],  # 并发推送的远程列表（远程名或URL）
+        "remote_policy": "warn",  # 部分远程失败时: warn=警告, abort=失败
+        "plan_threshold_mb": 50,  # 预估传输量超过该值(MB)时需要确认
+        "metrics_max_kb": 1024,  # 本地指标文件轮转大小(KB)，0 表示不记录
+        "network_timeout": 300  # push/ls-remote 超时(秒)，0 表示不限制
     }
 
 def upgrade_config(config: dict) -> dict:
     """兼容旧配置（确保包含所有必要字段）"""
     if "force" not in config:  # 如果旧配置缺少force字段
         config["force"] = False  # 添加默认值
+    if "remotes" not in config:
+        config["remotes"] = ["origin"]
+    if "remote_policy" not in config:
+        config["remote_policy"] = "warn"
+    if "plan_threshold_mb" not in config:
+        config["plan_threshold_mb"] = 50
+    if "metrics_max_kb" not in config:
+        config["metrics_max_kb"] = 1024
+    if "network_timeout" not in config:
+        config["network_timeout"] = 300
     return config
 
 def show_config_table(config: dict):
@@ -46,6 +61,13 @@ def show_config_table(config: dict):
     force_status = "[green]ON" if config["force"] else "[red]OFF"
     table.add_row("FORCE MODE", force_status)
     
+    # 推送远程
+    table.add_row("REMOTES", ", ".join(config["remotes"]))
+    table.add_row("REMOTE POLICY", config["remote_policy"])
+    table.add_row("PLAN THRESHOLD", f"{config['plan_threshold_mb']} MB")
+    table.add_row("METRICS", f"{config['metrics_max_kb']} KB" if config["metrics_max_kb"] else "[red]OFF")
+    table.add_row("NETWORK TIMEOUT", f"{config['network_timeout']} s" if config["network_timeout"] else "[red]OFF")
+    
     console.print(table)
 
 def setup_config():
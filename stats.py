@@ -0,0 +1,51 @@
+import argparse
+from datetime import datetime
+from utils.metrics import load_records, load_totals, summarize, percentile, write_textfile, get_metrics_path
+from utils.plan import format_size
+
+# 阶段显示顺序
+PHASE_ORDER = ["total", "discovery", "fetch", "clone", "copy", "commit", "push"]
+
+def show_stats(records):
+    """按命令和阶段显示 p50/p95 耗时"""
+    print(f"📊 Git-Go 运行统计 ({len(records)} 次, 最早 {datetime.fromtimestamp(records[0]['ts']):%Y-%m-%d %H:%M})")
+    print(f"{'命令':<14}{'阶段':<12}{'次数':>6}{'p50':>10}{'p95':>10}")
+    durations = summarize(records)
+    for cmd in sorted({c for c, _ in durations}):
+        phases = sorted(
+            (name for c, name in durations if c == cmd),
+            key=lambda n: PHASE_ORDER.index(n) if n in PHASE_ORDER else len(PHASE_ORDER)
+        )
+        for name in phases:
+            values = durations[(cmd, name)]
+            print(f"{cmd:<14}{name:<12}{len(values):>6}"
+                  f"{percentile(values, 50):>9.2f}s{percentile(values, 95):>9.2f}s")
+
+    print("\n结果统计:")
+    for cmd in sorted({r["cmd"] for r in records}):
+        runs = [r for r in records if r["cmd"] == cmd]
+        outcomes = {}
+        for r in runs:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items()))
+        sent = sum(r.get("bytes", 0) for r in runs)
+        print(f"• {cmd}: {detail}; 传输约 {format_size(sent)}")
+
+def stats(textfile=None):
+    records = load_records()
+    if not records:
+        print(f"📭 暂无记录: {get_metrics_path()}")
+        return
+    if textfile:
+        # 计数器使用不随轮转减少的累计值
+        write_textfile(textfile, load_totals())
+        print(f"✅ 已写入 Prometheus textfile: {textfile}")
+        return
+    show_stats(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Git-Go 运行统计")
+    parser.add_argument("--textfile", help="写入 node_exporter textfile collector 格式的指标文件（如 /var/lib/node_exporter/git_go.prom）")
+    args = parser.parse_args()
+    stats(textfile=args.textfile)
@@ -0,0 +1,52 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+import pytest
+
+# 测试直接导入仓库根目录下的 utils 包
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def git(*args, cwd=None, input=None) -> str:
+    """执行git命令并返回去掉首尾空白的输出（失败时抛出异常）"""
+    return subprocess.run(
+        ["git", *args], cwd=cwd, input=input, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+def make_bare(path: Path, hook: str = None) -> str:
+    """创建本地裸仓库作为远程，hook 为 pre-receive 钩子的脚本内容"""
+    git("init", "-q", "--bare", str(path))
+    if hook:
+        hook_path = path / "hooks" / "pre-receive"
+        hook_path.write_text(f"#!/bin/sh\n{hook}\n")
+        hook_path.chmod(0o755)
+    return str(path)
+
+def write_config(**values):
+    """写入用户配置文件（未指定的字段使用默认值）"""
+    from utils.config import get_config_path
+    cfg_path = get_config_path()
+    cfg_path.parent.mkdir(parents=True, exist_ok=True)
+    cfg_path.write_text(json.dumps(values))
+
+@pytest.fixture
+def git_env(tmp_path, monkeypatch):
+    """隔离的git环境：独立的HOME（配置和指标文件）和固定的提交身份"""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "Git-Go Test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "test@example.com")
+    return tmp_path
+
+@pytest.fixture
+def work_repo(git_env):
+    """带一个提交的本地工作仓库"""
+    work = git_env / "work"
+    git("init", "-q", str(work))
+    (work / "a.txt").write_text("a\n")
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "v0.1.0 init", cwd=work)
+    return work
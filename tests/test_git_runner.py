@@ -0,0 +1,82 @@
+import os
+import time
+import asyncio
+import subprocess
+import pytest
+from conftest import write_config
+from utils import git_runner
+from utils.git_runner import run_git_async, run_sync, gather
+
+# 别名命令由git启动的shell执行，是git的子进程；sleep 持有输出管道
+SLOW = ("-c", "alias.slow=!sleep 10", "slow")
+
+def test_timeout_kills_child_processes(work_repo):
+    start = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_sync(run_git_async(*SLOW, cwd=work_repo, timeout=0.3))
+    # 只杀掉git时，sleep 仍持有管道，要等它结束才能返回
+    assert time.perf_counter() - start < 3
+
+def test_cancel_kills_child_processes(work_repo):
+    async def cancel_slow():
+        task = asyncio.ensure_future(run_git_async(*SLOW, cwd=work_repo))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.perf_counter()
+    run_sync(cancel_slow())
+    assert time.perf_counter() - start < 3
+
+def test_gather_cancels_remaining_on_failure(work_repo):
+    start = time.perf_counter()
+    with pytest.raises(subprocess.CalledProcessError):
+        run_sync(gather(
+            run_git_async(*SLOW, cwd=work_repo),
+            run_git_async("rev-parse", "--verify", "no-such-ref", cwd=work_repo, check=True)
+        ))
+    assert time.perf_counter() - start < 3
+
+@pytest.mark.parametrize("args, expected", [
+    (("push", "origin"), "push"),
+    (("--literal-pathspecs", "--work-tree=/tmp", "add", "-A"), "add"),
+    (("-c", "core.splitIndex=true", "-C", "dir", "fetch"), "fetch"),
+])
+def test_subcommand(args, expected):
+    assert git_runner._subcommand(args) == expected
+
+def test_network_commands_get_default_timeout(work_repo):
+    write_config(network_timeout=0.3)
+    # ls-remote 到一个永不应答的"远程"（ext:: 传输运行 sleep）
+    start = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_sync(run_git_async(
+            "-c", "protocol.ext.allow=always", "ls-remote", "ext::sleep 10", cwd=work_repo
+        ))
+    # 同组运行时也要杀掉 sleep，否则要等它结束才能返回
+    assert time.perf_counter() - start < 3
+
+def test_network_timeout_can_be_disabled(work_repo):
+    write_config(network_timeout=0)
+    assert git_runner._network_timeout() is None
+
+def test_fetch_and_clone_have_no_default_timeout(work_repo):
+    write_config(network_timeout=0.3)
+    result = run_sync(run_git_async(
+        "-c", "protocol.ext.allow=always", "fetch", "ext::sleep 1", cwd=work_repo
+    ))
+    assert result.returncode != 0  # sleep 结束后才失败，没有超时
+
+def test_network_commands_keep_the_terminal_session(work_repo):
+    # 访问网络的命令与本进程同一会话（可以在终端输入密码），本地命令在独立会话中
+    report_sid = "ext::sh -c echo% SID% $(ps% -o% sid=% -p% $$)% 1>&2"
+    result = run_sync(run_git_async(
+        "-c", "protocol.ext.allow=always", "ls-remote", report_sid, cwd=work_repo
+    ))
+    assert f"SID {os.getsid(0)}" in result.stderr
+
+    alias = run_sync(run_git_async(
+        "-c", "alias.sid=!ps -o sid= -p $$", "sid", cwd=work_repo
+    ))
+    assert alias.stdout.strip() != str(os.getsid(0))
@@ -0,0 +1,58 @@
+import json
+import re
+from utils import metrics
+from utils.config import get_config_path
+
+def configure(max_kb):
+    cfg_path = get_config_path()
+    cfg_path.parent.mkdir(parents=True, exist_ok=True)
+    cfg_path.write_text(json.dumps({"metrics_max_kb": max_kb}))
+
+@metrics.record_run("run")
+def fake_run(ok=True):
+    with metrics.phase("push"):
+        metrics.add_bytes(100)
+    return ok
+
+def counter(text, name, labels):
+    match = re.search(rf"^{name}{{{re.escape(labels)}}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0
+
+def test_counters_survive_rotation(git_env):
+    configure(1)  # 1KB，约十条记录就轮转一次
+    previous = 0
+    for i in range(200):
+        fake_run(ok=i % 4 != 0)
+        text = metrics.render_prometheus(metrics.load_totals())
+        runs = sum(counter(text, "gitgo_runs_total", f'command="run",outcome="{o}"') for o in ("ok", "fail"))
+        assert runs == previous + 1  # 计数器只增不减
+        previous = runs
+
+    assert len(metrics.load_records()) < 200  # 旧记录已被轮转丢弃
+    text = metrics.render_prometheus(metrics.load_totals())
+    assert counter(text, "gitgo_runs_total", 'command="run",outcome="fail"') == 50
+    assert counter(text, "gitgo_transfer_bytes_total", 'command="run"') == 200 * 100
+    assert counter(text, "gitgo_phase_duration_seconds_count", 'command="run",phase="push"') == 200
+    assert counter(text, "gitgo_phase_duration_seconds_bucket", 'command="run",phase="push",le="+Inf"') == 200
+
+def test_totals_are_backfilled_from_existing_records(git_env):
+    configure(1024)
+    for _ in range(3):
+        fake_run()
+    metrics.get_totals_path().unlink()  # 升级前只有记录文件
+    fake_run()
+    assert metrics.load_totals()["runs"] == {"run": {"ok": 4}}
+
+def test_disabled_metrics_write_nothing(git_env):
+    configure(0)
+    fake_run()
+    assert not metrics.get_metrics_path().exists()
+    assert not metrics.get_totals_path().exists()
+
+def test_textfile_is_written_atomically(git_env, tmp_path):
+    configure(1024)
+    fake_run()
+    out = tmp_path / "git_go.prom"
+    metrics.write_textfile(str(out), metrics.load_totals())
+    assert 'gitgo_runs_total{command="run",outcome="ok"} 1' in out.read_text()
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith("git_go")] == ["git_go.prom"]
@@ -0,0 +1,127 @@
+import json
+import subprocess
+import pytest
+import utils.plan
+from conftest import git, make_bare, write_config
+from utils.git_runner import run_sync
+from utils.plan import make_plan
+from utils.scope import promoted_tree
+
+def write_tree(work):
+    git("add", "-A", cwd=work)
+    return git("write-tree", cwd=work)
+
+def disk_sizes(repo, objects):
+    out = git("cat-file", "--batch-check=%(objectsize:disk)", cwd=repo, input="\n".join(objects) + "\n")
+    return sum(int(size) for size in out.split())
+
+def has_object(repo, oid):
+    return subprocess.run(["git", "cat-file", "-e", oid], cwd=repo).returncode == 0
+
+@pytest.fixture
+def remote(work_repo, git_env):
+    """已推送到裸仓库dev分支的工作仓库"""
+    origin = make_bare(git_env / "origin.git")
+    git("push", "-q", origin, "HEAD:refs/heads/dev", cwd=work_repo)
+    return origin
+
+def test_cached_plan_skips_git(work_repo, monkeypatch):
+    tip = git("rev-parse", "HEAD", cwd=work_repo)
+    (work_repo / "b.txt").write_text("b\n")
+    tree = write_tree(work_repo)
+    calls = []
+    real_run_git_async = utils.plan.run_git_async
+
+    async def counting(*args, **kwargs):
+        calls.append(args[0])
+        return await real_run_git_async(*args, **kwargs)
+
+    monkeypatch.setattr(utils.plan, "run_git_async", counting)
+    first = run_sync(make_plan(str(work_repo), tree, tip))
+    assert {"diff-tree", "rev-list"} <= set(calls)
+
+    calls.clear()
+    assert run_sync(make_plan(str(work_repo), tree, tip)) == first
+    assert not {"diff-tree", "rev-list", "cat-file"} & set(calls)
+
+def test_estimate_counts_objects_missing_from_remote(work_repo, remote):
+    tip = git("rev-parse", "dev", cwd=remote)
+    (work_repo / "dir").mkdir()
+    (work_repo / "dir" / "c.txt").write_text("c\n" * 1000)
+    (work_repo / "b.txt").write_text("b\n")
+    (work_repo / "copy.txt").write_text("a\n")  # 与a.txt内容相同，远程已有
+    tree = write_tree(work_repo)
+
+    plan = run_sync(make_plan(str(work_repo), tree, tip))
+    assert sorted(plan.changes) == [("A", "b.txt"), ("A", "copy.txt"), ("A", "dir/c.txt")]
+
+    # 逐个确认远程裸仓库中缺少的对象：根树、dir树、两个新blob
+    listed = git("rev-list", "--objects", "--no-object-names", tree, cwd=work_repo).split()
+    missing = [oid for oid in listed if not has_object(remote, oid)]
+    assert plan.objects == len(missing) == 4
+    assert plan.bytes == disk_sizes(work_repo, missing)
+
+def test_known_trees_are_not_counted(work_repo, remote):
+    # 复制 dev → beta：源分支的树远程已有
+    (work_repo / "svc").mkdir()
+    (work_repo / "svc" / "app.txt").write_text("app\n" * 500)
+    (work_repo / "a.txt").write_text("a2\n")
+    git("add", "-A", cwd=work_repo)
+    git("commit", "-q", "-m", "v0.2.0-dev.1 svc", cwd=work_repo)
+    git("push", "-q", remote, "HEAD:refs/heads/dev", "HEAD~1:refs/heads/beta", cwd=work_repo)
+    dev_tree = git("rev-parse", "HEAD^{tree}", cwd=work_repo)
+    beta_tip = git("rev-parse", "HEAD~1", cwd=work_repo)
+    beta_tree = git("rev-parse", "HEAD~1^{tree}", cwd=work_repo)
+
+    unknown = run_sync(make_plan(str(work_repo), dev_tree, beta_tip))
+    whole = run_sync(make_plan(str(work_repo), dev_tree, beta_tip, known_trees=(dev_tree,)))
+    assert unknown.objects == 4  # 根树、svc树、app.txt、新的a.txt
+    assert (whole.objects, whole.bytes) == (0, 0)
+    assert whole.changes == unknown.changes == [("M", "a.txt"), ("A", "svc/app.txt")]
+
+    # 按子目录复制时只有嫁接出的新根树需要发送
+    grafted = run_sync(promoted_tree(str(work_repo), dev_tree, beta_tree, "svc"))
+    scoped = run_sync(make_plan(str(work_repo), grafted, beta_tip, known_trees=(dev_tree,)))
+    assert scoped.changes == [("A", "svc/app.txt")]
+    assert scoped.objects == 1
+    assert scoped.bytes == disk_sizes(work_repo, [grafted])
+
+    cache = json.loads((work_repo / ".git" / "git-go" / "plans.json").read_text())
+    assert f"{dev_tree}:{beta_tip}" in cache and f"{dev_tree}:{beta_tip}:{dev_tree}" in cache
+
+class Answers:
+    """按顺序返回预设答案的 questionary 替身"""
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.asked = []
+
+    def __call__(self, message, **kwargs):
+        self.asked.append(message)
+        answer = self.answers.pop(0)
+        return type("Question", (), {"ask": lambda _: answer})()
+
+@pytest.mark.parametrize("threshold_mb, confirmed, pushed", [
+    (0, False, False),
+    (0, True, True),
+    (50, None, True),
+])
+def test_large_push_needs_confirmation(work_repo, remote, monkeypatch, capsys, threshold_mb, confirmed, pushed):
+    questionary = pytest.importorskip("questionary")
+    main = pytest.importorskip("main")
+    git("remote", "add", "origin", remote, cwd=work_repo)
+    write_config(plan_threshold_mb=threshold_mb)
+    (work_repo / "b.txt").write_text("b\n")
+    monkeypatch.chdir(work_repo)
+    before = git("rev-parse", "dev", cwd=remote)
+
+    confirm = Answers(confirmed)
+    monkeypatch.setattr(questionary, "text", Answers("0.1.0", "t", "d"))
+    monkeypatch.setattr(questionary, "confirm", confirm)
+    try:
+        main.run()
+    except SystemExit as e:
+        assert e.code == 0
+    assert len(confirm.asked) == (0 if confirmed is None else 1)
+    assert (git("rev-parse", "dev", cwd=remote) != before) == pushed
+    if not pushed:
+        assert "🚫 操作取消" in capsys.readouterr().out
@@ -0,0 +1,142 @@
+import json
+import pytest
+import utils.push
+from conftest import git, make_bare, write_config
+from utils.config import get_config_path
+from utils.push import FinalVersionManager, PushStatus
+
+@pytest.fixture
+def project(work_repo, git_env, monkeypatch):
+    """origin 和一个镜像的dev都指向本地当前提交，配置为同时推送两者"""
+    origin = make_bare(git_env / "origin.git")
+    mirror = make_bare(git_env / "mirror.git")
+    git("remote", "add", "origin", origin, cwd=work_repo)
+    for url in (origin, mirror):
+        git("push", "-q", url, "HEAD:refs/heads/dev", cwd=work_repo)
+
+    cfg_path = get_config_path()
+    cfg_path.parent.mkdir(parents=True)
+    cfg_path.write_text(json.dumps({"remotes": ["origin", mirror]}))
+    monkeypatch.chdir(work_repo)
+    return work_repo, origin, mirror
+
+def dev_tip(remote):
+    return git("rev-parse", "dev", cwd=remote)
+
+def test_identical_tree_is_a_noop(project):
+    work, origin, mirror = project
+    before = dev_tip(origin), dev_tip(mirror)
+    manager = FinalVersionManager()
+    assert manager.unchanged(manager.plan())
+    assert manager.push_with_power("v0.1.0-dev.1", "t", "d") is PushStatus.NOOP
+    assert (dev_tip(origin), dev_tip(mirror)) == before
+
+def test_force_empty_pushes_anyway(project):
+    work, origin, mirror = project
+    manager = FinalVersionManager()
+    assert manager.push_with_power("v0.1.0-dev.1", "t", "d", force_empty=True) is PushStatus.OK
+    assert git("log", "-1", "--format=%s", "dev", cwd=origin) == "v0.1.0-dev.1 t"
+    assert dev_tip(mirror) == dev_tip(origin)
+
+def test_stale_mirror_is_not_skipped(project):
+    work, origin, mirror = project
+    # 新版本只推送到了origin，镜像推送失败后仍停留在旧提交
+    (work / "a.txt").write_text("new\n")
+    git("commit", "-q", "-am", "v0.1.0-dev.1 new", cwd=work)
+    git("push", "-q", origin, "HEAD:refs/heads/dev", cwd=work)
+
+    manager = FinalVersionManager()
+    plan = manager.plan()
+    assert not plan.changes  # 与origin一致
+    assert not manager.unchanged(plan)
+    assert manager.push_with_power("v0.1.0-dev.2", "t", "d", plan=plan) is PushStatus.OK
+    assert dev_tip(mirror) == dev_tip(origin)
+
+def test_changed_tree_is_pushed(project):
+    work, origin, mirror = project
+    (work / "b.txt").write_text("b\n")
+    manager = FinalVersionManager()
+    plan = manager.plan()
+    assert [path for _, path in plan.changes] == ["b.txt"]
+    assert manager.push_with_power("v0.1.0-dev.1", "t", "d", plan=plan) is PushStatus.OK
+    assert git("ls-tree", "--name-only", "dev", cwd=origin).splitlines() == ["a.txt", "b.txt"]
+
+def test_missing_origin_exits_cleanly(work_repo, git_env, monkeypatch, capsys, caplog):
+    monkeypatch.chdir(work_repo)
+    with pytest.raises(SystemExit) as exc:
+        FinalVersionManager()
+    assert exc.value.code == 1
+    assert "❌ 无法获取远程地址" in capsys.readouterr().out
+    assert "never retrieved" not in caplog.text
+
+def test_scoped_push_replaces_only_its_directory(work_repo, git_env, monkeypatch):
+    for path in ("svc/app.txt", "svc/lib/util.txt", "web/index.txt"):
+        (work_repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (work_repo / path).write_text(f"{path}\n")
+    git("add", "-A", cwd=work_repo)
+    git("commit", "-q", "-m", "[svc] v1.2.0-dev.3 base", cwd=work_repo)
+    origin = make_bare(git_env / "origin.git")
+    git("remote", "add", "origin", origin, cwd=work_repo)
+    git("push", "-q", "origin", "HEAD:refs/heads/dev", cwd=work_repo)
+    base = dev_tip(origin)
+
+    # 子目录内外都有本地改动，只有 svc/ 内的应被推送
+    (work_repo / "svc" / "app.txt").write_text("changed\n")
+    (work_repo / "web" / "index.txt").write_text("local only\n")
+    (work_repo / "a.txt").write_text("local only\n")
+    monkeypatch.chdir(work_repo)
+    manager = FinalVersionManager(scope="svc")
+    assert manager.current_version == (1, 2, 0, 3)
+    plan = manager.plan()
+    assert [path for _, path in plan.changes] == ["svc/app.txt"]
+    assert manager.push_with_power("v1.2.0-dev.4", "t", "d", plan=plan) is PushStatus.OK
+
+    head = dev_tip(origin)
+    assert git("log", "-1", "--format=%s%n%P", "dev", cwd=origin).splitlines() == ["[svc] v1.2.0-dev.4 t", base]
+    assert git("diff-tree", "-r", "--name-only", base, head, cwd=origin).splitlines() == ["svc/app.txt"]
+    # 子目录外的树对象和 svc/lib 子树原样复用
+    for path in ("a.txt", "web", "svc/lib"):
+        assert git("rev-parse", f"{head}:{path}", cwd=origin) == git("rev-parse", f"{base}:{path}", cwd=origin)
+
+def test_push_status_truthiness():
+    assert PushStatus.OK and PushStatus.NOOP
+    assert not PushStatus.FAILED
+
+def test_checked_plan_does_not_query_remotes_again(project, monkeypatch):
+    work, origin, mirror = project
+    # 与origin一致、镜像落后：unchanged 需要逐个查询远程
+    (work / "a.txt").write_text("new\n")
+    git("commit", "-q", "-am", "v0.1.0-dev.1 new", cwd=work)
+    git("push", "-q", origin, "HEAD:refs/heads/dev", cwd=work)
+    manager = FinalVersionManager()
+    plan = manager.plan()
+    queried = []
+    real_remote_tree = manager._remote_tree
+
+    async def counting(url):
+        queried.append(url)
+        return await real_remote_tree(url)
+
+    monkeypatch.setattr(manager, "_remote_tree", counting)
+    unchanged = manager.unchanged(plan)
+    assert unchanged is False and len(queried) == 2
+    assert manager.push_with_power("v0.1.0-dev.2", "t", "d", plan=plan, unchanged=unchanged) is PushStatus.OK
+    assert len(queried) == 2
+    assert dev_tip(mirror) == dev_tip(origin)
+
+def test_bytes_are_counted_per_successful_remote(work_repo, git_env, monkeypatch):
+    origin = make_bare(git_env / "origin.git")
+    broken = make_bare(git_env / "broken.git", "exit 1")
+    git("remote", "add", "origin", origin, cwd=work_repo)
+    git("push", "-q", "origin", "HEAD:refs/heads/dev", cwd=work_repo)
+    write_config(remotes=["origin", broken], remote_policy="warn")
+    (work_repo / "b.txt").write_text("b\n" * 100)
+    monkeypatch.chdir(work_repo)
+    counted = []
+    monkeypatch.setattr(utils.push, "add_bytes", counted.append)
+
+    manager = FinalVersionManager()
+    plan = manager.plan()
+    assert plan.bytes > 0
+    assert manager.push_with_power("v0.1.0-dev.1", "t", "d", plan=plan) is PushStatus.OK
+    assert counted == [plan.bytes]
@@ -0,0 +1,71 @@
+import json
+import time
+import pytest
+from conftest import git, make_bare, write_config
+from utils.config import get_config_path, load_config
+from utils.git_runner import run_sync
+from utils.remotes import push_to_remotes, resolve_remotes
+
+REFSPEC = "HEAD:refs/heads/dev"
+
+def test_push_to_remotes_runs_concurrently(work_repo, git_env):
+    remotes = [
+        make_bare(git_env / "slow1.git", "sleep 1"),
+        make_bare(git_env / "slow2.git", "sleep 1"),
+        make_bare(git_env / "fast.git"),
+    ]
+    start = time.perf_counter()
+    ok, results = run_sync(push_to_remotes(str(work_repo), REFSPEC, remotes))
+    assert ok is True and [r.remote for r in results] == remotes
+    total = time.perf_counter() - start
+
+    # 总耗时接近最慢的远程，而不是各远程耗时之和
+    assert 1.0 <= total < 1.8
+    head = git("rev-parse", "HEAD", cwd=work_repo)
+    for remote in remotes:
+        assert git("rev-parse", "dev", cwd=remote) == head
+
+@pytest.mark.parametrize("policy, expected", [("warn", True), ("abort", False)])
+def test_partial_failure_follows_policy(work_repo, git_env, policy, expected):
+    good = make_bare(git_env / "good.git")
+    bad = make_bare(git_env / "bad.git", "exit 1")
+    ok, results = run_sync(push_to_remotes(str(work_repo), REFSPEC, [good, bad], policy))
+    assert ok is expected
+    assert [r.ok for r in results] == [True, False]
+    # 策略只影响结果判定，成功的远程照常更新
+    assert git("rev-parse", "dev", cwd=good) == git("rev-parse", "HEAD", cwd=work_repo)
+
+def test_all_remotes_failed_is_failure_with_warn(work_repo, git_env):
+    bad = [make_bare(git_env / f"bad{i}.git", "exit 1") for i in range(2)]
+    assert run_sync(push_to_remotes(str(work_repo), REFSPEC, bad, "warn"))[0] is False
+
+def test_unknown_policy_is_rejected(work_repo, git_env):
+    with pytest.raises(ValueError):
+        run_sync(push_to_remotes(str(work_repo), REFSPEC, [make_bare(git_env / "r.git")], "Abort"))
+
+def test_resolve_remotes_accepts_names_and_urls(work_repo, git_env):
+    origin = make_bare(git_env / "origin.git")
+    mirror = make_bare(git_env / "mirror.git")
+    git("remote", "add", "origin", origin, cwd=work_repo)
+    urls = run_sync(resolve_remotes(["origin", mirror, origin], str(work_repo)))
+    assert urls == [origin, mirror]
+
+@pytest.mark.parametrize("policy", ["Abort", "ignore", ""])
+def test_load_config_rejects_unknown_remote_policy(git_env, policy):
+    cfg_path = get_config_path()
+    cfg_path.parent.mkdir(parents=True)
+    cfg_path.write_text(json.dumps({"remote_policy": policy}))
+    with pytest.raises(ValueError):
+        load_config()
+
+def test_load_config_defaults(git_env):
+    assert load_config()["remote_policy"] == "warn"
+
+def test_hung_remote_times_out_without_blocking_others(work_repo, git_env, monkeypatch):
+    write_config(network_timeout=0.5)
+    good = make_bare(git_env / "good.git")
+    hung = make_bare(git_env / "hung.git", "sleep 10")
+    start = time.perf_counter()
+    assert run_sync(push_to_remotes(str(work_repo), REFSPEC, [good, hung], "warn"))[0] is True
+    assert time.perf_counter() - start < 3
+    assert git("rev-parse", "dev", cwd=good) == git("rev-parse", "HEAD", cwd=work_repo)
@@ -0,0 +1,104 @@
+import pytest
+from conftest import git
+from utils.git_runner import run_sync
+from utils.scope import latest_version_subject, normalize_scope, promote_commit
+
+def commit_scope(work, scope, subject):
+    (work / scope).mkdir(exist_ok=True)
+    (work / scope / "app.txt").write_text(f"{subject}\n")
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", f"[{scope}] {subject}", cwd=work)
+
+def promote(repo, scope, message):
+    dev = git("rev-parse", "dev", cwd=repo)
+    commit = run_sync(promote_commit(str(repo), dev, "refs/heads/beta", message, scope))
+    git("update-ref", "refs/heads/beta", commit, cwd=repo)
+    return commit
+
+def test_scoped_promotions_keep_other_scope_versions(work_repo):
+    git("branch", "-M", "dev", cwd=work_repo)
+    commit_scope(work_repo, "svcA", "v1.0.0-dev.1 a")
+    commit_scope(work_repo, "svcB", "v2.0.0-dev.3 b")
+
+    promote(work_repo, "svcA", "[svcA] v1.0.0-beta.1\n\nupdate from\nv1.0.0-dev.1")
+    promote(work_repo, "svcB", "[svcB] v2.0.0-beta.1\n\nupdate from\nv2.0.0-dev.3")
+
+    versions = {
+        scope: run_sync(latest_version_subject(str(work_repo), "beta", scope))
+        for scope in ("svcA", "svcB")
+    }
+    assert versions == {"svcA": "v1.0.0-beta.1", "svcB": "v2.0.0-beta.1"}
+    # beta 上只有两个被复制的子目录，不包含dev根目录的其他文件
+    assert git("ls-tree", "--name-only", "beta", cwd=work_repo).splitlines() == ["svcA", "svcB"]
+
+def test_version_is_found_beyond_recent_history(work_repo):
+    commit_scope(work_repo, "c++", "v3.1.0-dev.2 deep")
+    # 1500 个无版本号的提交（部分正文以版本号开头），用 fast-import 快速生成
+    head = git("rev-parse", "HEAD", cwd=work_repo)
+    stream = []
+    for i in range(1500):
+        message = f"chore {i}\n\nv9.9.9 only in body\n"
+        stream.append(
+            f"commit refs/heads/deep\ncommitter t <t@t> {1700000000 + i} +0000\n"
+            f"data {len(message.encode())}\n{message}" + (f"from {head}\n" if i == 0 else "") + "\n"
+        )
+    git("fast-import", "--quiet", cwd=work_repo, input="".join(stream))
+
+    assert run_sync(latest_version_subject(str(work_repo), "deep", "c++")) == "v3.1.0-dev.2 deep"
+    assert run_sync(latest_version_subject(str(work_repo), "deep")) == "v0.1.0 init"
+    assert run_sync(latest_version_subject(str(work_repo), "deep", "c")) is None
+
+def test_scoped_promotion_replaces_only_its_directory(work_repo):
+    git("branch", "-M", "dev", cwd=work_repo)
+    commit_scope(work_repo, "svcA", "v1.0.0-dev.1 a")
+    commit_scope(work_repo, "svcB", "v2.0.0-dev.1 b")
+    promote(work_repo, "svcA", "[svcA] v1.0.0-beta.1")
+    promote(work_repo, "svcB", "[svcB] v2.0.0-beta.1")
+
+    commit_scope(work_repo, "svcA", "v1.0.1-dev.1 a2")
+    commit_scope(work_repo, "svcB", "v2.0.1-dev.1 b2")
+    promote(work_repo, "svcA", "[svcA] v1.0.1-beta.1")
+    assert git("show", "beta:svcA/app.txt", cwd=work_repo) == "v1.0.1-dev.1 a2"
+    assert git("show", "beta:svcB/app.txt", cwd=work_repo) == "v2.0.0-dev.1 b"
+
+def test_unscoped_promotion_is_a_root_commit(work_repo):
+    git("branch", "-M", "dev", cwd=work_repo)
+    commit_scope(work_repo, "svcA", "v1.0.0-dev.1 a")
+    promote(work_repo, "svcA", "[svcA] v1.0.0-beta.1")
+    # 整个分支复制时不继承目标分支的历史
+    commit = promote(work_repo, None, "v0.1.0-beta.1")
+    assert git("rev-list", "--count", commit, cwd=work_repo) == "1"
+    assert git("rev-parse", f"{commit}^{{tree}}", cwd=work_repo) == git("rev-parse", "dev^{tree}", cwd=work_repo)
+
+@pytest.mark.parametrize("path, expected", [
+    (None, None), ("", None), (".", None), ("svc/", "svc"), ("./svc//api", "svc/api"), ("svc\\api", "svc/api"),
+])
+def test_normalize_scope(path, expected):
+    assert normalize_scope(path) == expected
+
+@pytest.mark.parametrize("path", ["..", "../other", "svc/../../x", ".git", ".git/hooks"])
+def test_normalize_scope_rejects_paths_outside_work_tree(path):
+    with pytest.raises(ValueError):
+        normalize_scope(path)
+
+def test_absolute_scope_is_resolved_against_root(tmp_path):
+    (tmp_path / "svc" / "api").mkdir(parents=True)
+    assert normalize_scope(str(tmp_path / "svc" / "api"), tmp_path) == "svc/api"
+    assert normalize_scope(str(tmp_path), tmp_path) is None
+    with pytest.raises(ValueError):
+        normalize_scope(str(tmp_path / "svc"))  # 没有仓库根目录时不接受绝对路径
+    with pytest.raises(ValueError):
+        normalize_scope(str(tmp_path.parent), tmp_path)
+
+def test_missing_scope_directory_is_rejected(tmp_path):
+    (tmp_path / "svc").mkdir()
+    assert normalize_scope("svc", tmp_path) == "svc"
+    with pytest.raises(ValueError):
+        normalize_scope("svcX", tmp_path)
+    with pytest.raises(ValueError):
+        normalize_scope(str(tmp_path / "svcX"), tmp_path)
+
+def test_promoting_missing_scope_is_rejected(work_repo):
+    git("branch", "-M", "dev", cwd=work_repo)
+    with pytest.raises(ValueError):
+        promote(work_repo, "svcX", "[svcX] v1.0.0-beta.1")
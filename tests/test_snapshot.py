@@ -0,0 +1,35 @@
+import os
+import subprocess
+from conftest import git
+from utils.git_runner import run_sync
+from utils.git_repo import get_state_dir
+from utils.snapshot import build_snapshot_tree
+
+def test_snapshot_does_not_touch_user_index(work_repo):
+    (work_repo / "new.txt").write_text("n\n")
+    tree = run_sync(build_snapshot_tree(str(work_repo)))
+    assert git("ls-tree", "--name-only", tree, cwd=work_repo).splitlines() == ["a.txt", "new.txt"]
+    assert git("status", "--porcelain", cwd=work_repo) == "?? new.txt"
+
+def test_split_index_files_stay_in_state_dir(work_repo):
+    for i in range(3):
+        (work_repo / f"f{i}.txt").write_text(f"{i}\n")
+        run_sync(build_snapshot_tree(str(work_repo)))
+
+    git_dir = work_repo / ".git"
+    assert not list(git_dir.glob("sharedindex.*"))
+    assert len(list((git_dir / "git-go" / "snapshot").glob("sharedindex.*"))) == 1
+
+def test_legacy_snapshot_index_is_removed(work_repo):
+    state_dir = run_sync(get_state_dir(str(work_repo)))
+    legacy = state_dir / "snapshot.index"
+    env = dict(os.environ, GIT_INDEX_FILE=str(legacy))
+    subprocess.run(
+        ["git", "-c", "core.splitIndex=true", "add", "-A"],
+        cwd=work_repo, env=env, check=True
+    )
+    assert list((work_repo / ".git").glob("sharedindex.*"))
+
+    run_sync(build_snapshot_tree(str(work_repo)))
+    assert not legacy.exists()
+    assert not list((work_repo / ".git").glob("sharedindex.*"))
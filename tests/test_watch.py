@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+import pytest
+import utils.snapshot
+from conftest import git
+from utils.git_runner import run_sync
+from utils.git_repo import get_state_dir
+from utils.snapshot import build_snapshot_tree
+from utils.watch import EXCLUDE_PATH, get_watcher, start_watcher, take_journal
+
+STARTED = 1.0
+
+@pytest.fixture
+def state_dir(work_repo):
+    """伪造一个正在运行的监视进程（当前进程），日志由测试直接写入"""
+    state_dir = run_sync(get_state_dir(str(work_repo)))
+    state_dir.mkdir(parents=True, exist_ok=True)
+    with open(state_dir / "watch.json", "w") as f:
+        json.dump({"pid": os.getpid(), "work_dir": str(work_repo), "started": STARTED}, f)
+    return state_dir
+
+def write_journal(state_dir, *paths):
+    with open(state_dir / "journal", "a") as f:
+        f.write("".join(f"{p}\n" for p in paths))
+
+def snapshot_files(work_repo):
+    tree = run_sync(build_snapshot_tree(str(work_repo)))
+    return git("ls-tree", "-r", "--name-only", tree, cwd=work_repo).splitlines()
+
+def test_take_journal_returns_changed_paths(work_repo, state_dir):
+    write_journal(state_dir, "a.txt", "dir/b.txt", "a.txt")
+    assert take_journal(state_dir, str(work_repo), STARTED) == ["a.txt", "dir/b.txt"]
+    assert take_journal(state_dir, str(work_repo), STARTED) == []
+
+def test_take_journal_requires_same_watcher(work_repo, state_dir):
+    write_journal(state_dir, "a.txt")
+    assert take_journal(state_dir, str(work_repo), None) is None
+    assert take_journal(state_dir, str(work_repo), STARTED + 1) is None
+
+@pytest.mark.parametrize("rule", [".gitignore", "sub/dir/.gitignore", EXCLUDE_PATH])
+def test_ignore_rule_change_forces_full_scan(work_repo, state_dir, rule):
+    write_journal(state_dir, "a.txt", rule)
+    assert take_journal(state_dir, str(work_repo), STARTED) is None
+
+def test_unignored_file_reaches_snapshot(work_repo, state_dir):
+    (work_repo / ".gitignore").write_text("*.log\n")
+    assert snapshot_files(work_repo) == ["a.txt"]  # 全量扫描，之后以日志为准
+
+    # secret.log 创建时被忽略，之后清空 .gitignore 使其不再被忽略
+    (work_repo / "secret.log").write_text("x\n")
+    (work_repo / "new.txt").write_text("y\n")
+    (work_repo / ".gitignore").write_text("")
+    write_journal(state_dir, "secret.log", "new.txt", ".gitignore")
+    assert snapshot_files(work_repo) == ["a.txt", "new.txt", "secret.log"]
+
+def test_journal_replay_matches_full_scan(work_repo, state_dir):
+    snapshot_files(work_repo)
+    (work_repo / "a.txt").unlink()
+    (work_repo / "newdir" / "sub").mkdir(parents=True)
+    (work_repo / "newdir" / "sub" / "x.txt").write_text("x\n")
+    write_journal(state_dir, "a.txt", "newdir")
+    assert snapshot_files(work_repo) == ["newdir/sub/x.txt"]
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.05)
+
+def full_scan_tree(work_repo, tmp_path):
+    """用独立的临时索引执行 git add -A，作为全量扫描的参照结果"""
+    env = dict(os.environ, GIT_INDEX_FILE=str(tmp_path / "full.index"))
+    for args in (["add", "-A"], ["write-tree"]):
+        result = subprocess.run(["git", *args], cwd=work_repo, env=env,
+                                check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify 仅支持Linux")
+def test_real_watcher_journal_matches_full_scan(work_repo, tmp_path, monkeypatch):
+    (work_repo / "old.txt").write_text("old\n")
+    (work_repo / "keep").mkdir()
+    (work_repo / "keep" / "k.txt").write_text("k\n")
+    (work_repo / "keep" / "stay.txt").write_text("stay\n")
+    state_dir = run_sync(get_state_dir(str(work_repo)))
+    assert start_watcher(str(work_repo))
+    pid = get_watcher(state_dir, str(work_repo))["pid"]
+    try:
+        run_sync(build_snapshot_tree(str(work_repo)))  # 全量扫描，与监视进程同步
+
+        (work_repo / "a.txt").write_text("changed\n")
+        os.rename(work_repo / "old.txt", work_repo / "keep" / "renamed.txt")
+        (work_repo / "keep" / "k.txt").unlink()
+        os.rename(work_repo / "keep", work_repo / "kept")
+        (work_repo / "kept" / "after.txt").write_text("after\n")
+        (work_repo / "fresh" / "deep").mkdir(parents=True)
+        (work_repo / "fresh" / "deep" / "n.txt").write_text("n\n")
+        (work_repo / "last.txt").write_text("last\n")
+        journal = state_dir / "journal"
+        wait_for(lambda: journal.exists() and "last.txt" in journal.read_text().split())
+
+        replayed = []
+        real_take_journal = utils.snapshot.take_journal
+
+        def recording(*args):
+            paths = real_take_journal(*args)
+            replayed.append(paths)
+            return paths
+
+        monkeypatch.setattr(utils.snapshot, "take_journal", recording)
+        tree = run_sync(build_snapshot_tree(str(work_repo)))
+        assert replayed[0] is not None and "last.txt" in replayed[0]  # 确实按日志重放
+        assert tree == full_scan_tree(work_repo, tmp_path)
+    finally:
+        os.kill(pid, signal.SIGTERM)
+    # SIGTERM 正常退出时会清理 watch.json
+    wait_for(lambda: not (state_dir / "watch.json").exists())
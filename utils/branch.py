@@ -3,6 +3,8 @@ import json
 import subprocess
 from pathlib import Path
 from typing import Dict, List
+from .git_runner import run_git
+from .metrics import record_run, phase
 
 class BranchManager:
     def __init__(self):
@@ -18,12 +20,7 @@ class BranchManager:
     def _get_repo_root(self) -> Path:
         """获取Git仓库根目录"""
         try:
-            result = subprocess.run(
-                ["git", "rev-parse", "--show-toplevel"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            result = run_git("rev-parse", "--show-toplevel", check=True)
             return Path(result.stdout.strip())
         except subprocess.CalledProcessError:
             raise RuntimeError("当前目录不是Git仓库")
@@ -43,13 +40,7 @@ class BranchManager:
 
     def _get_remote_branches(self) -> List[str]:
         """获取所有远程分支列表"""
-        result = subprocess.run(
-            ["git", "branch", "-r"],
-            cwd=self.repo_root,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        result = run_git("branch", "-r", cwd=self.repo_root, check=True)
         return [
             b.strip().replace("origin/", "")
             for b in result.stdout.splitlines()
@@ -66,34 +57,29 @@ class BranchManager:
         """创建并推送新分支"""
         try:
             # 创建本地分支
-            subprocess.run(
-                ["git", "checkout", "-b", branch_name],
-                cwd=self.repo_root,
-                check=True
-            )
+            run_git("checkout", "-b", branch_name, cwd=self.repo_root, check=True)
             # 推送到远程
-            subprocess.run(
-                ["git", "push", "-u", "origin", branch_name],
-                cwd=self.repo_root,
-                check=True
-            )
+            run_git("push", "-u", "origin", branch_name, cwd=self.repo_root, check=True)
             return True
-        except subprocess.CalledProcessError as e:
-            print(f"创建分支 {branch_name} 失败: {e.stderr}")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            print(f"创建分支 {branch_name} 失败: {e.stderr or e}")
             return False
 
     def sync_branches(self):
         """同步所有配置的分支"""
-        missing = self.check_missing_branches()
+        with phase("discovery"):
+            missing = self.check_missing_branches()
         if not missing:
             print("✅ 所有配置分支已存在")
             return
 
         print(f"需创建分支: {', '.join(missing)}")
-        for branch in missing:
-            if self.create_branch(branch):
-                print(f"  已创建: {branch}")
+        with phase("push"):
+            for branch in missing:
+                if self.create_branch(branch):
+                    print(f"  已创建: {branch}")
 
+@record_run("sync_branches")
 def sync_branches():
     try:
         manager = BranchManager()
@@ -0,0 +1,41 @@
+import os
+import json
+from pathlib import Path
+
+def get_config_path() -> Path:
+    """获取配置文件路径（跨平台）"""
+    if os.name == "nt":
+        return Path(os.getenv("APPDATA")) / "Git-Go" / "git-go.cfg"
+    return Path.home() / ".config" / "git-go" / "git-go.cfg"
+
+DEFAULT_CONFIG = {
+    "branches": {
+        "MAIN": "main",
+        "BETA": "beta",
+        "DEV": "dev"
+    },
+    "force": False,
+    "remotes": ["origin"],      # 推送目标（远程名或URL），并发推送
+    "remote_policy": "warn",    # 部分远程失败时: warn=警告继续, abort=视为失败
+    "plan_threshold_mb": 50,    # 预估传输量超过该值时需要确认
+    "metrics_max_kb": 1024,     # 本地指标文件轮转大小，0 表示不记录
+    "network_timeout": 300      # push/ls-remote 的超时（秒），0 表示不限制
+}
+
+REMOTE_POLICIES = ("warn", "abort")
+
+def load_config() -> dict:
+    """
+    读取配置文件，缺失字段使用默认值（文件不存在时返回默认配置）
+    配置值非法时抛出 ValueError
+    """
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    cfg_path = get_config_path()
+    if cfg_path.exists():
+        with open(cfg_path) as f:
+            config.update(json.load(f))
+    if config["remote_policy"] not in REMOTE_POLICIES:
+        raise ValueError(
+            f"配置项 remote_policy 只能是 {' 或 '.join(REMOTE_POLICIES)}，当前为: {config['remote_policy']!r}"
+        )
+    return config
@@ -1,7 +1,9 @@
 import os
+import asyncio
 import subprocess
 from pathlib import Path
 from typing import NamedTuple, Optional
+from .git_runner import run_git_async, run_sync
 
 class RepoInfo(NamedTuple):
     """Git仓库信息数据类"""
@@ -26,7 +28,7 @@ def find_git_root(start_path: Path) -> Optional[Path]:
         
         current_path = current_path.parent
 
-def get_repo_info() -> RepoInfo:
+async def get_repo_info_async() -> RepoInfo:
     """
     检测Git仓库状态（优先检查/project目录）
     逻辑：
@@ -45,35 +47,44 @@ def get_repo_info() -> RepoInfo:
             # 获取仓库信息
             os.chdir(git_root)  # 切换到仓库根目录确保命令执行正确
             
-            branch = subprocess.run(
-                ["git", "branch", "--show-current"],
-                capture_output=True, text=True
-            ).stdout.strip() if subprocess.run(["git", "rev-parse", "--is-inside-work-tree"], 
-                                              capture_output=True).returncode == 0 else None
-            
-            remote = subprocess.run(
-                ["git", "remote", "get-url", "origin"],
-                capture_output=True, text=True
-            ).stdout.strip() if subprocess.run(["git", "remote"], 
-                                             capture_output=True).returncode == 0 else None
+            # 三条查询互不依赖，并发执行
+            inside, branch, remote = await asyncio.gather(
+                run_git_async("rev-parse", "--is-inside-work-tree", cwd=git_root),
+                run_git_async("branch", "--show-current", cwd=git_root),
+                run_git_async("remote", "get-url", "origin", cwd=git_root)
+            )
             
             return RepoInfo(
                 is_repo=True,
                 root_path=git_root,
                 is_project_repo=(git_root == project_dir),
-                current_branch=branch or None,
-                remote_url=remote or None
+                current_branch=(branch.stdout.strip() if inside.returncode == 0 else None) or None,
+                remote_url=remote.stdout.strip() or None
             )
     
     return RepoInfo(False, None, False, None, None)
 
-def check_remote_connection() -> bool:
+def get_repo_info() -> RepoInfo:
+    """get_repo_info_async 的同步版本"""
+    return run_sync(get_repo_info_async())
+
+async def get_state_dir(work_dir) -> Path:
+    """返回Git-Go在.git目录中的状态目录（快照索引、计划缓存等）"""
+    git_dir = (await run_git_async(
+        "rev-parse", "--absolute-git-dir", cwd=work_dir, check=True
+    )).stdout.strip()
+    state_dir = Path(git_dir) / "git-go"
+    state_dir.mkdir(exist_ok=True)
+    return state_dir
+
+async def check_remote_connection_async(cwd=None, timeout: float = 30) -> bool:
     """检查远程仓库是否可达（需在仓库内调用）"""
     try:
-        subprocess.run(
-            ["git", "ls-remote", "origin"],
-            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-        return True
-    except subprocess.CalledProcessError:
-        return False
\ No newline at end of file
+        result = await run_git_async("ls-remote", "origin", cwd=cwd, timeout=timeout)
+        return result.returncode == 0
+    except subprocess.TimeoutExpired:
+        return False
+
+def check_remote_connection() -> bool:
+    """check_remote_connection_async 的同步版本"""
+    return run_sync(check_remote_connection_async())
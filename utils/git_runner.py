@@ -0,0 +1,166 @@
+import os
+import signal
+import asyncio
+import subprocess
+import weakref
+from typing import Awaitable, Dict, List, Mapping, Optional
+from .config import load_config
+
+# 同时运行的git进程上限
+MAX_CONCURRENCY = 8
+
+# 访问网络的命令可能需要在终端输入密码（HTTPS凭据、SSH密钥口令），保留控制终端
+NETWORK_COMMANDS = {"clone", "fetch", "pull", "push", "ls-remote"}
+# 未指定timeout时使用配置 network_timeout 的命令（避免一个无响应的远程永远阻塞）；
+# clone/fetch 在大仓库中可能合理地持续很久，不设默认超时
+TIMEOUT_COMMANDS = {"push", "ls-remote"}
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _semaphore() -> asyncio.Semaphore:
+    """每个事件循环一个并发限制（同步包装每次都会新建事件循环）"""
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+def _subcommand(args) -> str:
+    """跳过全局选项（如 --work-tree=、-c key=value），返回git子命令"""
+    args = iter(args)
+    for arg in args:
+        if arg in ("-c", "-C"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return ""
+
+def _network_timeout() -> Optional[float]:
+    """配置中的网络超时（秒），0 表示不限制"""
+    try:
+        timeout = load_config()["network_timeout"]
+    except (OSError, ValueError):
+        timeout = 300
+    return timeout or None
+
+def _child_map() -> Dict[int, List[int]]:
+    """父进程 -> 子进程列表（Linux读/proc，其他POSIX系统用ps）"""
+    pairs = []
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # 进程名可能含空格和括号，取最后一个 ')' 之后的字段：状态、父进程
+                    pairs.append((int(entry), int(f.read().rsplit(")", 1)[1].split()[1])))
+            except (OSError, IndexError, ValueError):
+                continue
+    else:
+        try:
+            out = subprocess.run(["ps", "-A", "-o", "pid=", "-o", "ppid="],
+                                 capture_output=True, text=True).stdout
+        except OSError:
+            out = ""
+        pairs = [tuple(map(int, line.split())) for line in out.splitlines() if len(line.split()) == 2]
+
+    children: Dict[int, List[int]] = {}
+    for pid, ppid in pairs:
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+def _descendants(pid: int) -> List[int]:
+    children = _child_map()
+    result, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+async def _kill(proc: asyncio.subprocess.Process, detached: bool):
+    """
+    杀掉git及其启动的所有子进程（ssh、钩子、别名命令等）并等待退出，子进程都结束后管道才会关闭
+    detached: git在独立的进程组中，直接杀掉整组；
+    否则git与本进程同组（保留终端），先找出它的所有子孙进程再逐个杀掉
+    Windows上只能杀掉git本身
+    """
+    try:
+        if os.name == "nt":
+            proc.kill()
+        elif detached:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            # 必须在杀掉git之前收集，否则子进程会被init收养而找不到
+            for pid in [*_descendants(proc.pid), proc.pid]:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+    except ProcessLookupError:
+        pass
+    await proc.communicate()
+
+async def run_git_async(*args: str, cwd=None, env: Optional[Mapping[str, str]] = None,
+                        input: Optional[str] = None, check: bool = False,
+                        timeout: Optional[float] = None,
+                        capture: bool = True) -> subprocess.CompletedProcess:
+    """
+    异步执行一条git命令
+    返回值和异常与 subprocess.run(text=True) 保持一致：
+    check=True 且失败时抛出 CalledProcessError，超时抛出 TimeoutExpired；
+    超时或任务被取消时会杀掉git及其子进程
+    push/ls-remote 未指定timeout时使用配置 network_timeout
+    capture=False 时输出直接显示在终端
+    访问网络的命令保留控制终端（可以输入密码）；其余命令在独立的进程组中运行
+    """
+    cmd = ["git", *args]
+    pipe = subprocess.PIPE if capture else None
+    subcommand = _subcommand(args)
+    if timeout is None and subcommand in TIMEOUT_COMMANDS:
+        timeout = _network_timeout()
+    detached = subcommand not in NETWORK_COMMANDS
+    async with _semaphore():
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=cwd, env=env,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=pipe, stderr=pipe,
+            start_new_session=detached
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(input.encode() if input is not None else None), timeout
+            )
+        except asyncio.TimeoutError:
+            await _kill(proc, detached)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except asyncio.CancelledError:
+            await _kill(proc, detached)
+            raise
+
+    result = subprocess.CompletedProcess(
+        cmd, proc.returncode,
+        stdout.decode(errors="replace") if stdout is not None else None,
+        stderr.decode(errors="replace") if stderr is not None else None
+    )
+    if check:
+        result.check_returncode()
+    return result
+
+def run_sync(awaitable: Awaitable):
+    """在同步代码中运行协程（不能在已运行的事件循环中调用）"""
+    return asyncio.run(awaitable)
+
+def run_git(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    """run_git_async 的同步包装，参数相同"""
+    return run_sync(run_git_async(*args, **kwargs))
+
+async def gather(*awaitables: Awaitable) -> List:
+    """并发等待多个任务，任一失败时取消其余任务并抛出异常"""
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from .config import get_config_path, load_config
+
+# 保留的轮转文件个数（metrics.jsonl.1 ~ .N）
+ROTATE_KEEP = 3
+
+def get_metrics_path() -> Path:
+    """指标文件与配置文件放在同一目录"""
+    return get_config_path().parent / "metrics.jsonl"
+
+def get_totals_path() -> Path:
+    """累计计数文件（Prometheus计数器来源），不参与轮转"""
+    return get_config_path().parent / "metrics_totals.json"
+
+
+class RunMetrics:
+    """一次命令执行的指标：各阶段耗时、传输字节数和结果"""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.time()
+        self.phases: Dict[str, float] = {}
+        self.bytes = 0
+        self.outcome: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # 同名阶段多次执行时累加
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def to_record(self) -> dict:
+        return {
+            "cmd": self.command,
+            "ts": round(self.started, 3),
+            "dur": round(time.time() - self.started, 3),
+            "outcome": self.outcome or "ok",
+            "bytes": self.bytes,
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+        }
+
+
+_current: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar("git_go_metrics", default=None)
+
+@contextmanager
+def phase(name: str):
+    """记录当前命令的一个阶段耗时（不在 record_run 中时不做任何事）"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
+
+def add_bytes(size: int):
+    """累加当前命令的传输字节数"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.bytes += size
+
+def set_outcome(outcome: str):
+    """设置当前命令的结果（ok/fail/cancel/plan/noop/error）"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.outcome = outcome
+
+
+def _rotate(path: Path, max_bytes: int):
+    """文件超过大小上限时轮转：metrics.jsonl -> .1 -> .2 ..."""
+    if not path.exists() or path.stat().st_size < max_bytes:
+        return
+    for i in range(ROTATE_KEEP, 0, -1):
+        src = path.with_name(f"{path.name}.{i - 1}") if i > 1 else path
+        if src.exists():
+            os.replace(src, path.with_name(f"{path.name}.{i}"))
+
+def _empty_totals() -> dict:
+    return {"runs": {}, "bytes": {}, "phases": {}, "last_run": {}}
+
+def _add_to_totals(totals: dict, record: dict):
+    """把一条记录累加到计数中（只增不减）"""
+    cmd = record["cmd"]
+    runs = totals["runs"].setdefault(cmd, {})
+    runs[record["outcome"]] = runs.get(record["outcome"], 0) + 1
+    totals["bytes"][cmd] = totals["bytes"].get(cmd, 0) + record.get("bytes", 0)
+    totals["last_run"][cmd] = max(totals["last_run"].get(cmd, 0), record["ts"])
+    for _, name, seconds in iter_phase_durations([record]):
+        hist = totals["phases"].setdefault(cmd, {}).setdefault(
+            name, {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+        )
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["count"] += 1
+        hist["sum"] = round(hist["sum"] + seconds, 4)
+
+def load_totals() -> dict:
+    """
+    读取累计计数；文件不存在时（首次使用）从现有记录生成
+    计数不会因日志轮转而变小，可直接作为Prometheus计数器
+    """
+    try:
+        with open(get_totals_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        totals = _empty_totals()
+        for record in load_records():
+            _add_to_totals(totals, record)
+        return totals
+
+def _save_totals(totals: dict):
+    path = get_totals_path()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(totals, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, path)
+
+def save_record(record: dict):
+    """累加计数并追加一条记录（写入失败不影响命令本身）"""
+    try:
+        max_kb = load_config()["metrics_max_kb"]
+    except (OSError, ValueError):
+        return
+    if not max_kb:
+        return
+    path = get_metrics_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先累加计数：计数文件不存在时由已有记录生成，不能包含本条
+        totals = load_totals()
+        _add_to_totals(totals, record)
+        _save_totals(totals)
+        _rotate(path, max_kb * 1024)
+        with open(path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+def load_records() -> List[dict]:
+    """读取所有记录（含轮转文件），按时间先后排列"""
+    path = get_metrics_path()
+    files = [path.with_name(f"{path.name}.{i}") for i in range(ROTATE_KEEP, 0, -1)] + [path]
+    records = []
+    for file in files:
+        if not file.exists():
+            continue
+        with open(file) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # 忽略写了一半的行
+    return records
+
+
+def record_run(command: str):
+    """
+    装饰器：记录一次命令执行的指标
+    结果判定：返回False为fail，sys.exit(0)为cancel，sys.exit(非0)为fail，
+    其他异常为error；被装饰函数也可以用 set_outcome 自行指定
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = RunMetrics(command)
+            token = _current.set(metrics)
+            try:
+                result = func(*args, **kwargs)
+                if result is False and metrics.outcome is None:
+                    metrics.outcome = "fail"
+                return result
+            except SystemExit as e:
+                if metrics.outcome is None:
+                    metrics.outcome = "cancel" if not e.code else "fail"
+                raise
+            except KeyboardInterrupt:
+                metrics.outcome = "cancel"
+                raise
+            except Exception:
+                metrics.outcome = "error"
+                raise
+            finally:
+                _current.reset(token)
+                save_record(metrics.to_record())
+        return wrapper
+    return decorator
+
+
+def iter_phase_durations(records: List[dict]) -> Iterator[tuple]:
+    """展开为 (命令, 阶段, 耗时) ，总耗时记为 total 阶段"""
+    for r in records:
+        yield r["cmd"], "total", r["dur"]
+        for name, seconds in r.get("phases", {}).items():
+            yield r["cmd"], name, seconds
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # 向上取整
+    return ordered[int(rank) - 1]
+
+def summarize(records: List[dict]) -> Dict[tuple, List[float]]:
+    """按 (命令, 阶段) 汇总耗时"""
+    durations: Dict[tuple, List[float]] = {}
+    for cmd, name, seconds in iter_phase_durations(records):
+        durations.setdefault((cmd, name), []).append(seconds)
+    return durations
+
+
+# 直方图分桶（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def render_prometheus(totals: dict) -> str:
+    """
+    生成 node_exporter textfile collector 格式的指标
+    数据来自累计计数（见 load_totals），不受记录文件轮转影响
+    """
+    lines = [
+        "# HELP gitgo_phase_duration_seconds Duration of Git-Go command phases.",
+        "# TYPE gitgo_phase_duration_seconds histogram",
+    ]
+    for cmd, phases in sorted(totals["phases"].items()):
+        for name, hist in sorted(phases.items()):
+            labels = f'command="{cmd}",phase="{name}"'
+            for bound, count in zip(BUCKETS, hist["buckets"]):
+                lines.append(f'gitgo_phase_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'gitgo_phase_duration_seconds_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+            lines.append(f"gitgo_phase_duration_seconds_sum{{{labels}}} {hist['sum']:.4f}")
+            lines.append(f"gitgo_phase_duration_seconds_count{{{labels}}} {hist['count']}")
+
+    lines += [
+        "# HELP gitgo_runs_total Git-Go command runs by outcome.",
+        "# TYPE gitgo_runs_total counter",
+    ]
+    lines += [
+        f'gitgo_runs_total{{command="{c}",outcome="{o}"}} {n}'
+        for c, outcomes in sorted(totals["runs"].items()) for o, n in sorted(outcomes.items())
+    ]
+    lines += [
+        "# HELP gitgo_transfer_bytes_total Estimated bytes pushed by Git-Go.",
+        "# TYPE gitgo_transfer_bytes_total counter",
+    ]
+    lines += [f'gitgo_transfer_bytes_total{{command="{c}"}} {n}' for c, n in sorted(totals["bytes"].items())]
+    lines += [
+        "# HELP gitgo_last_run_timestamp_seconds Start time of the latest Git-Go run.",
+        "# TYPE gitgo_last_run_timestamp_seconds gauge",
+    ]
+    lines += [f'gitgo_last_run_timestamp_seconds{{command="{c}"}} {t}' for c, t in sorted(totals["last_run"].items())]
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path: str, totals: dict):
+    """原子写入textfile（先写临时文件再改名，避免node_exporter读到半个文件）"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus(totals))
+    os.replace(tmp, path)
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .git_repo import get_state_dir
+from .git_runner import run_git_async, gather
+from .snapshot import tree_of
+
+MAX_CACHE_ENTRIES = 32
+
+class PushPlan(NamedTuple):
+    """推送计划：变更路径及预估传输量"""
+    local_tree: str
+    remote_tip: Optional[str]
+    changes: List[Tuple[str, str]]  # (状态, 路径)
+    objects: int                    # 需要发送的新对象数
+    bytes: int                      # 预估传输字节数（对象压缩后大小）
+
+def _load_cache(cache_path: Path) -> Dict[str, dict]:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache_path: Path, cache: Dict[str, dict]):
+    # 只保留最近的若干条
+    items = list(cache.items())[-MAX_CACHE_ENTRIES:]
+    with open(cache_path, "w") as f:
+        json.dump(dict(items), f)
+
+async def _changed_paths(work_dir: str, old_tree: str, new_tree: str) -> List[Tuple[str, str]]:
+    """比较两棵树，返回变更路径列表"""
+    out = (await run_git_async(
+        "diff-tree", "-r", "-z", "--no-renames", "--name-status", old_tree, new_tree,
+        cwd=work_dir, check=True
+    )).stdout
+    fields = out.split("\0")[:-1]
+    return list(zip(fields[0::2], fields[1::2]))
+
+async def _estimate_transfer(work_dir: str, new_tree: str, *old_trees: str) -> Tuple[int, int]:
+    """统计new_tree中远程（old_trees）没有的对象数及其压缩后大小"""
+    objects = (await run_git_async(
+        "rev-list", "--objects", "--no-object-names", new_tree, "--not", *old_trees,
+        cwd=work_dir, check=True
+    )).stdout
+    if not objects.strip():
+        return 0, 0
+    sizes = (await run_git_async(
+        "cat-file", "--batch-check=%(objectsize:disk)",
+        cwd=work_dir, input=objects, check=True
+    )).stdout.split()
+    return len(sizes), sum(int(s) for s in sizes)
+
+async def make_plan(work_dir: str, local_tree: str, remote_tip: Optional[str],
+                    known_trees: Tuple[str, ...] = ()) -> PushPlan:
+    """
+    计算推送计划，按 (本地树, 远程提交) 缓存结果，
+    --plan 预览后的真正推送可以直接复用
+    known_trees: 远程已有的其他树（不计入传输量）
+    """
+    key = ":".join([local_tree, remote_tip or "", *known_trees])
+    cache_path = (await get_state_dir(work_dir)) / "plans.json"
+    cache = _load_cache(cache_path)
+    if key in cache:
+        entry = cache[key]
+        return PushPlan(local_tree, remote_tip, [tuple(c) for c in entry["changes"]],
+                        entry["objects"], entry["bytes"])
+
+    remote_tree = await tree_of(work_dir, remote_tip)
+    changes, (objects, size) = await gather(
+        _changed_paths(work_dir, remote_tree, local_tree),
+        _estimate_transfer(work_dir, local_tree, remote_tree, *known_trees)
+    )
+
+    cache.pop(key, None)
+    cache[key] = {"changes": changes, "objects": objects, "bytes": size}
+    _save_cache(cache_path, cache)
+    return PushPlan(local_tree, remote_tip, changes, objects, size)
+
+def format_size(size: int) -> str:
+    """字节数转可读字符串"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def show_plan(plan: PushPlan, target: str, limit: int = 20):
+    """打印推送计划"""
+    print(f"📋 推送计划 → {target}")
+    print(f"• 本地树: {plan.local_tree[:12]}")
+    print(f"• 远程提交: {plan.remote_tip[:12] if plan.remote_tip else '(新分支)'}")
+    print(f"• 变更文件: {len(plan.changes)} 个")
+    for status, path in plan.changes[:limit]:
+        print(f"    {status} {path}")
+    if len(plan.changes) > limit:
+        print(f"    ... 以及另外 {len(plan.changes) - limit} 个")
+    print(f"• 预估传输: {plan.objects} 个对象, 约 {format_size(plan.bytes)}")
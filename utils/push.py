@@ -1,15 +1,54 @@
 import subprocess
 import re
-import tempfile
 import sys
 import os
-import shutil
+from enum import Enum
 from typing import Optional, Tuple
+from .config import load_config
+from .git_runner import run_git_async, run_sync, gather
+from .remotes import resolve_remotes, push_to_remotes
+from .snapshot import build_snapshot_tree, snapshot_is_current, resolve_ref, tree_of
+from .plan import PushPlan, make_plan, format_size
+from .scope import normalize_scope, scope_prefix, latest_version_subject, graft_tree
+from .metrics import phase, add_bytes, set_outcome
+
+class PushStatus(Enum):
+    """推送结果"""
+    OK = "ok"        # 已创建新版本并推送
+    NOOP = "noop"    # 所有远程已与本地一致，没有提交也没有推送
+    FAILED = "fail"
+
+    def __bool__(self) -> bool:
+        # 兼容原先返回bool的调用方：只有失败为假
+        return self is not PushStatus.FAILED
+
 
 class FinalVersionManager:
-    def __init__(self):
-        self.remote_url = self._get_remote_url()
-        self.current_version = self._fetch_actual_version()
+    def __init__(self, scope: Optional[str] = None):
+        # scope: 只推送的子目录（monorepo），版本号也按子目录独立计算
+        try:
+            self.scope = normalize_scope(scope, os.getcwd())
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        try:
+            config = load_config()
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        self.remote_policy = config["remote_policy"]
+        self.plan_threshold = config["plan_threshold_mb"] * 1024 * 1024
+        # 远程地址、推送目标解析、dev版本获取互不依赖，并发执行
+        with phase("fetch"):
+            self.remote_url, self.remotes, self.current_version = run_sync(gather(
+                self._get_remote_url(),
+                resolve_remotes(config["remotes"]),
+                self._fetch_actual_version()
+            ))
+        # 不能在并发任务中退出（SystemExit 会变成未处理的任务异常），统一在这里检查
+        if not self.remote_url:
+            print("❌ 无法获取远程地址")
+            sys.exit(1)
         if not self.current_version:
             print("❌ 错误：无法获取远程dev分支版本")
             print("请确认：")
@@ -17,37 +56,30 @@ class FinalVersionManager:
             print("2. 最新提交格式为 vX.Y.Z 或 vX.Y.Z-dev.N")
             sys.exit(1)
 
-    def _get_remote_url(self) -> str:
-        """获取远程地址（失败则退出）"""
-        result = subprocess.run(
-            ["git", "remote", "get-url", "origin"],
-            capture_output=True, text=True
-        )
+    async def _get_remote_url(self) -> Optional[str]:
+        """获取远程地址（失败返回None）"""
+        result = await run_git_async("remote", "get-url", "origin")
         if result.returncode != 0:
-            print("❌ 无法获取远程地址")
-            sys.exit(1)
+            return None
         return result.stdout.strip()
 
-    def _fetch_actual_version(self) -> Optional[Tuple[int, int, int, int]]:
+    async def _fetch_actual_version(self) -> Optional[Tuple[int, int, int, int]]:
         """增强版版本号获取，解决空返回问题"""
         try:
             # 1. 检查本地是否有远程分支缓存
-            subprocess.run(["git", "fetch", "origin", "dev"], 
-                        capture_output=True, check=True)
+            await run_git_async("fetch", "origin", "dev", check=True)
             
-            # 2. 获取提交信息（不使用ls-remote，直接使用本地缓存）
-            result = subprocess.run(
-                ["git", "log", "origin/dev", "-1", "--pretty=%B"],
-                capture_output=True, text=True
-            )
+            # 2. 获取最近一次（该子目录）带版本号的提交标题（直接使用本地缓存）
+            commit_msg = await latest_version_subject(None, "origin/dev", self.scope)
             
-            if result.returncode != 0 or not result.stdout.strip():
+            if not commit_msg:
+                if self.scope:
+                    print(f"⚠️ 子目录 {self.scope} 还没有版本记录，从 v0.0.0 开始")
+                    return (0, 0, 0, 0)
                 print("❌ 无法获取dev分支提交信息")
-                print(f"Git错误: {result.stderr.strip()}")
                 return None
 
-            commit_msg = result.stdout.strip()
-            print(f"✅ 获取到的提交信息: '{commit_msg}'")  # 调试输出
+            print(f"✅ 获取到的提交信息: '{scope_prefix(self.scope)}{commit_msg}'")  # 调试输出
 
             # 3. 优化版正则匹配
             pattern = r'''
@@ -72,7 +104,7 @@ class FinalVersionManager:
             return None
 
         except subprocess.CalledProcessError as e:
-            print(f"❌ Git命令执行失败: {e.stderr.decode().strip()}")
+            print(f"❌ Git命令执行失败: {e.stderr.strip()}")
             return None
         except Exception as e:
             print(f"❌ 发生意外错误: {str(e)}")
@@ -100,96 +132,114 @@ class FinalVersionManager:
             print(f"❌ 非法版本格式: {input_version}")
             sys.exit(1)
 
-    def push_with_power(self, version: str, title: str, desc: str) -> bool:
-        """终极强制推送 - 完全用本地文件覆盖远程"""
+    async def _plan(self) -> PushPlan:
+        work_dir = os.getcwd()
+        with phase("discovery"):
+            local_tree, remote_tip = await gather(
+                build_snapshot_tree(work_dir, self.scope),
+                resolve_ref(work_dir, "origin/dev")
+            )
+            if self.scope:
+                # 子目录模式：把新子树嫁接到远程dev的树上，其余目录原样复用
+                local_tree = await graft_tree(work_dir, await tree_of(work_dir, remote_tip), self.scope, local_tree)
+            return await make_plan(work_dir, local_tree, remote_tip)
+
+    def plan(self) -> PushPlan:
+        """计算本地快照相对远程dev的推送计划（结果按本地树+远程提交缓存）"""
+        return run_sync(self._plan())
+
+    def refresh(self, plan: PushPlan) -> PushPlan:
+        """返回仍然有效的推送计划：快照可能已过期（有文件改动或无法确定）时才重新计算"""
+        if run_sync(snapshot_is_current(os.getcwd())):
+            return plan
+        return self.plan()
+
+    async def _remote_tree(self, url: str) -> Optional[str]:
+        """远程dev分支当前的树ID（分支不存在、无法访问或本地没有该提交时为None）"""
+        work_dir = os.getcwd()
         try:
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                print("🔄 正在准备临时仓库...")
-                
-                # 1. 克隆仓库（完整克隆）
-                subprocess.run(
-                    ["git", "clone", self.remote_url, tmp_dir],
-                    check=True, capture_output=True
-                )
-                
-                # 2. 检查远程dev分支是否存在
-                remote_branch_check = subprocess.run(
-                    ["git", "ls-remote", "--heads", "origin", "dev"],
-                    cwd=tmp_dir, capture_output=True, text=True
-                )
-                
-                if remote_branch_check.returncode == 0 and remote_branch_check.stdout.strip():
-                    # 远程dev分支存在，创建本地跟踪分支
-                    print("✅ 检测到远程dev分支")
-                    subprocess.run(
-                        ["git", "checkout", "-b", "dev", "--track", "origin/dev"],
-                        cwd=tmp_dir, check=True
-                    )
-                else:
-                    # 远程dev分支不存在，创建新分支
-                    print("⚠️ 远程dev分支不存在，将创建新分支")
-                    subprocess.run(
-                        ["git", "checkout", "--orphan", "dev"],
-                        cwd=tmp_dir, check=True
-                    )
-                    subprocess.run(
-                        ["git", "rm", "-rf", "."],
-                        cwd=tmp_dir, check=True
-                    )
-                    
-                # 3. 清空临时仓库（保留.git目录）
-                print("🧹 清空临时仓库...")
-                for item in os.listdir(tmp_dir):
-                    if item != '.git':
-                        path = os.path.join(tmp_dir, item)
-                        if os.path.isdir(path):
-                            shutil.rmtree(path)
-                        else:
-                            os.unlink(path)
-                
-                # 4. 复制本地所有文件（除.git和.gitignore外）
-                print("📦 复制本地文件...")
-                current_dir = os.getcwd()
-                for item in os.listdir(current_dir):
-                    if item not in ['.git', '.gitignore']:
-                        src = os.path.join(current_dir, item)
-                        dst = os.path.join(tmp_dir, item)
-                        if os.path.isdir(src):
-                            shutil.copytree(src, dst, dirs_exist_ok=True)
-                        else:
-                            shutil.copy2(src, dst)
-                
-                # 5. 创建强制提交
-                print("💾 创建提交...")
-                subprocess.run(["git", "add", "."], cwd=tmp_dir, check=True)
-                
-                # 检查是否有更改需要提交
-                status_check = subprocess.run(
-                    ["git", "status", "--porcelain"],
-                    cwd=tmp_dir, capture_output=True, text=True
-                )
-                if not status_check.stdout.strip():
-                    print("⚠️ 没有检测到文件变更，将创建空提交")
-                
-                subprocess.run(
-                    ["git", "commit", "--allow-empty", "-m", f"{version} {title}\n\n{desc}"],
-                    cwd=tmp_dir, check=True
-                )
-                
-                # 6. 强制推送
-                print("🚀 正在强制推送...")
-                subprocess.run(
-                    ["git", "push", "origin", "dev", "--force"],
-                    cwd=tmp_dir, check=True
-                )
-                
+            result = await run_git_async("ls-remote", url, "refs/heads/dev", cwd=work_dir)
+        except subprocess.TimeoutExpired:
+            return None
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        tree = await run_git_async(
+            "rev-parse", "--verify", "-q", f"{result.stdout.split()[0]}^{{tree}}", cwd=work_dir
+        )
+        return tree.stdout.strip() if tree.returncode == 0 else None
+
+    async def _unchanged(self, plan: PushPlan) -> bool:
+        if not plan.remote_tip:
+            return False
+        # 远程dev的树已在本地对象库中，先直接比较树哈希
+        if plan.local_tree != await tree_of(os.getcwd(), plan.remote_tip):
+            return False
+        # 再确认每个推送目标（之前推送失败的镜像需要补推，不能跳过）
+        trees = await gather(*(self._remote_tree(url) for url in self.remotes))
+        return all(tree == plan.local_tree for tree in trees)
+
+    def unchanged(self, plan: PushPlan) -> bool:
+        """本地快照与所有推送目标的dev树完全相同（无需推送，只读取远程引用）"""
+        return run_sync(self._unchanged(plan))
+
+    async def _push(self, version: str, title: str, desc: str, force_empty: bool = False,
+                    plan: Optional[PushPlan] = None, unchanged: Optional[bool] = None) -> PushStatus:
+        work_dir = os.getcwd()
+        
+        # 1. 生成本地快照（调用方已算好计划时直接复用同一棵树）
+        if plan is None:
+            print("📦 生成本地快照...")
+            plan = await self._plan()
+        
+        # 2. 检查远程dev分支是否存在
+        if plan.remote_tip:
+            print("✅ 检测到远程dev分支")
+        else:
+            print("⚠️ 远程dev分支不存在，将创建新分支")
+        if unchanged is None:
+            unchanged = await self._unchanged(plan)
+        if unchanged:
+            if not force_empty:
+                print("✅ 所有远程的dev已与本地文件一致，跳过推送")
+                set_outcome("noop")
+                return PushStatus.NOOP
+            print("⚠️ 没有检测到文件变更，将创建空提交")
+        
+        # 3. 创建提交（父提交为远程dev）
+        print("💾 创建提交...")
+        parents = ["-p", plan.remote_tip] if plan.remote_tip else []
+        with phase("commit"):
+            commit = (await run_git_async(
+                "commit-tree", plan.local_tree, *parents, "-m",
+                f"{scope_prefix(self.scope)}{version} {title}\n\n{desc}",
+                cwd=work_dir, check=True
+            )).stdout.strip()
+        
+        # 4. 强制推送（所有远程并发）
+        print(f"🚀 正在强制推送... (约 {format_size(plan.bytes)})")
+        with phase("push"):
+            ok, results = await push_to_remotes(work_dir, f"{commit}:refs/heads/dev", self.remotes, self.remote_policy)
+        # 只统计实际接收了推送的远程
+        add_bytes(plan.bytes * sum(r.ok for r in results))
+        return PushStatus.OK if ok else PushStatus.FAILED
+
+    def push_with_power(self, version: str, title: str, desc: str, force_empty: bool = False,
+                        plan: Optional[PushPlan] = None, unchanged: Optional[bool] = None) -> PushStatus:
+        """
+        终极强制推送 - 完全用本地文件覆盖远程（直接在本地对象库构建提交，无需克隆）
+        force_empty: 本地与所有远程完全一致时仍创建空提交并推送（否则返回 NOOP）
+        plan: 已计算且未过期的推送计划（见 refresh），为None时重新生成快照
+        unchanged: 调用方对同一计划已做过的 unchanged 检查结果，为None时在此查询各远程
+        """
+        try:
+            status = run_sync(self._push(version, title, desc, force_empty, plan, unchanged))
+            if status is PushStatus.OK:
                 print("✅ 推送成功！")
-                return True
+            return status
                 
         except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode().strip() if e.stderr else str(e)
-            print(f"❌ Git命令执行失败: {error_msg}")
-            return False
+            print(f"❌ Git命令执行失败: {(e.stderr or '').strip() or str(e)}")
+            return PushStatus.FAILED
         except Exception as e:
             print(f"❌ 推送异常: {str(e)}")
-            return False
+            return PushStatus.FAILED
@@ -0,0 +1,71 @@
+import asyncio
+import subprocess
+import time
+from typing import List, NamedTuple, Optional, Tuple
+from .git_runner import run_git_async
+
+class PushResult(NamedTuple):
+    """单个远程的推送结果"""
+    remote: str
+    ok: bool
+    seconds: float
+    message: str
+
+async def resolve_remotes(remotes: List[str], repo_dir: Optional[str] = None) -> List[str]:
+    """
+    将配置中的远程列表解析为URL
+    条目可以是本地仓库已配置的远程名（如origin），也可以直接是URL
+    """
+    remotes = remotes or ["origin"]
+    results = await asyncio.gather(*(
+        run_git_async("remote", "get-url", remote, cwd=repo_dir) for remote in remotes
+    ))
+    urls = []
+    for remote, result in zip(remotes, results):
+        url = result.stdout.strip() if result.returncode == 0 else remote
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+async def _push_one(cwd: str, url: str, refspec: str, force: bool) -> PushResult:
+    """推送到单个远程并计时"""
+    args = ["push", url, refspec]
+    if force:
+        args.append("--force")
+    start = time.perf_counter()
+    try:
+        result = await run_git_async(*args, cwd=cwd)
+    except subprocess.TimeoutExpired as e:
+        # 一个无响应的远程只算作失败，不影响其他远程
+        return PushResult(url, False, time.perf_counter() - start, f"超时（{e.timeout:g}s，见配置 network_timeout）")
+    elapsed = time.perf_counter() - start
+    message = result.stderr.strip().splitlines()[0] if result.stderr.strip() else ""
+    return PushResult(url, result.returncode == 0, elapsed, message)
+
+async def push_to_remotes(cwd: str, refspec: str, remotes: List[str],
+                    policy: str = "warn", force: bool = True) -> Tuple[bool, List[PushResult]]:
+    """
+    将同一个引用并发推送到所有远程，返回 (是否成功, 每个远程的结果)
+    policy: warn  - 至少一个远程成功即视为成功，失败的远程给出警告
+            abort - 任一远程失败即视为失败
+    """
+    if policy not in ("warn", "abort"):
+        raise ValueError(f"未知的 remote_policy: {policy!r}")
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_push_one(cwd, url, refspec, force) for url in remotes))
+    total = time.perf_counter() - start
+
+    print(f"📡 推送结果 ({len(remotes)} 个远程, 总耗时 {total:.2f}s):")
+    for r in results:
+        icon = "✅" if r.ok else "❌"
+        detail = "" if r.ok else f" - {r.message}"
+        print(f"  {icon} {r.remote} ({r.seconds:.2f}s){detail}")
+
+    failed = [r for r in results if not r.ok]
+    if not failed:
+        return True, results
+    if policy == "abort" or len(failed) == len(results):
+        print(f"❌ {len(failed)} 个远程推送失败")
+        return False, results
+    print(f"⚠️ {len(failed)} 个远程推送失败（remote_policy=warn，继续）")
+    return True, results
@@ -0,0 +1,133 @@
+import os
+import re
+import posixpath
+from typing import Optional
+from .git_runner import run_git_async, gather
+from .snapshot import EMPTY_TREE, resolve_ref, tree_of
+
+# 提交标题中的版本号（可带 "[子目录] " 前缀）
+VERSION_SUBJECT = re.compile(r'^(?:\[(?P<scope>[^\]]+)\] )?(?P<rest>v\d+\.\d+\.\d+.*)$')
+
+def normalize_scope(path: Optional[str], root=None) -> Optional[str]:
+    """
+    把 --path 参数规范为相对仓库根目录的POSIX路径，根目录返回None
+    root: 仓库根目录，绝对路径按它换算，且子目录必须存在于其中；
+    不指定时只接受相对路径
+    """
+    if not path:
+        return None
+    scope = path.replace("\\", "/")
+    if os.path.isabs(path) or scope.startswith("/"):
+        if root is None:
+            raise ValueError(f"请使用相对仓库根目录的路径: {path}")
+        scope = os.path.relpath(os.path.realpath(path), os.path.realpath(root)).replace("\\", "/")
+    scope = posixpath.normpath(scope).rstrip("/")
+    if scope in ("", "."):
+        return None
+    if scope == ".." or scope.startswith("../") or scope.split("/")[0] == ".git":
+        raise ValueError(f"非法的子目录: {path}")
+    if root is not None and not os.path.isdir(os.path.join(root, scope)):
+        raise ValueError(f"子目录不存在: {scope}")
+    return scope
+
+def scope_prefix(scope: Optional[str]) -> str:
+    """子目录提交的标题前缀"""
+    return f"[{scope}] " if scope else ""
+
+# 每次从git读取的候选提交数
+VERSION_BATCH = 20
+
+def _ere_escape(text: str) -> str:
+    """转义git扩展正则（-E）中的特殊字符"""
+    return re.sub(r"([][.^$*+?(){}|\\])", r"\\\1", text)
+
+async def latest_version_subject(work_dir, ref: str, scope: Optional[str] = None) -> Optional[str]:
+    """
+    在ref的全部历史中查找该子目录最近一次带版本号的提交，返回去掉前缀后的标题
+    每个子目录有独立的版本线；不带 --path 时只看没有前缀的提交
+    由git按提交信息过滤（--grep 也会匹配正文中的行，所以仍需检查标题）
+    """
+    prefix = f"\\[{_ere_escape(scope)}\\] " if scope else ""
+    skip = 0
+    while True:
+        result = await run_git_async(
+            "log", ref, "--format=%s", "-E", f"--grep=^{prefix}v[0-9]",
+            "-n", str(VERSION_BATCH), f"--skip={skip}", cwd=work_dir
+        )
+        if result.returncode != 0:
+            return None
+        subjects = result.stdout.splitlines()
+        for subject in subjects:
+            match = VERSION_SUBJECT.match(subject)
+            if match and match.group("scope") == scope:
+                return match.group("rest")
+        if len(subjects) < VERSION_BATCH:
+            return None
+        skip += VERSION_BATCH
+
+async def _ls_tree(work_dir, tree: Optional[str]) -> list:
+    if not tree or tree == EMPTY_TREE:
+        return []
+    out = (await run_git_async("ls-tree", "-z", tree, cwd=work_dir, check=True)).stdout
+    return [entry for entry in out.split("\0") if entry]
+
+async def graft_tree(work_dir, base_tree: Optional[str], scope: str, subtree: str) -> str:
+    """
+    用subtree替换base_tree中scope目录，返回新的根树ID
+    只重建scope路径上的几层树对象，其余树对象原样复用
+    subtree为空树时删除该目录
+    """
+    name, _, rest = scope.partition("/")
+    entries = await _ls_tree(work_dir, base_tree)
+    # ls-tree 每行格式: "<mode> <type> <id>\t<name>"
+    current = next((e for e in entries if e.split("\t", 1)[1] == name), None)
+    entries = [e for e in entries if e is not current]
+
+    if rest:
+        child = current.split("\t")[0].split()[2] if current and " tree " in current else None
+        subtree = await graft_tree(work_dir, child, rest, subtree)
+    if subtree != EMPTY_TREE:
+        entries.append(f"040000 tree {subtree}\t{name}")
+    if not entries:
+        return EMPTY_TREE
+
+    return (await run_git_async(
+        "mktree", "-z", cwd=work_dir, input="\0".join(entries) + "\0", check=True
+    )).stdout.strip()
+
+async def subtree_of(work_dir, tree: str, scope: str) -> str:
+    """返回tree中scope目录的子树ID（不存在时为空树）"""
+    out = (await run_git_async("ls-tree", "-z", "-d", tree, "--", scope, cwd=work_dir, check=True)).stdout
+    for entry in out.split("\0"):
+        info, _, name = entry.partition("\t")
+        if name == scope and " tree " in info:
+            return info.split()[2]
+    return EMPTY_TREE
+
+async def promoted_tree(work_dir, from_tree: str, to_tree: Optional[str], scope: Optional[str]) -> str:
+    """分支复制后目标分支的树：整棵源树，或只把源树中的scope目录嫁接到目标树上"""
+    if not scope:
+        return from_tree
+    subtree = await subtree_of(work_dir, from_tree, scope)
+    if subtree == EMPTY_TREE:
+        # 否则会把目标分支上的该目录整个删除
+        raise ValueError(f"源分支中没有子目录: {scope}")
+    return await graft_tree(work_dir, to_tree, scope, subtree)
+
+async def promote_commit(work_dir, from_commit: str, to_ref: str, message: str,
+                         scope: Optional[str] = None) -> str:
+    """
+    创建分支复制的新提交，返回提交ID
+    不带scope时是完全独立的新提交（没有父提交）；
+    带scope时只替换该子目录，并以目标分支当前提交为父提交，
+    这样其他子目录在目标分支上的版本记录仍能从历史中找到
+    """
+    from_tree, to_tip = await gather(
+        tree_of(work_dir, from_commit),
+        resolve_ref(work_dir, to_ref)
+    )
+    new_tree = await promoted_tree(work_dir, from_tree, await tree_of(work_dir, to_tip), scope)
+    parents = ["-p", to_tip] if scope and to_tip else []
+    return (await run_git_async(
+        "commit-tree", new_tree, *parents, "-m", message, cwd=work_dir, check=True
+    )).stdout.strip()
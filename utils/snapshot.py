@@ -0,0 +1,186 @@
+import os
+import json
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+from .git_repo import get_state_dir
+from .git_runner import run_git_async, gather
+from .watch import get_watcher, take_journal, discard_journal, journal_is_clean
+
+# Git 内置的空树对象
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+def _synced_with(meta_path) -> Optional[float]:
+    """快照索引上次与监视进程同步的时间（见 snapshot.json）"""
+    try:
+        with open(meta_path) as f:
+            return json.load(f).get("synced_with")
+    except (OSError, ValueError):
+        return None
+
+async def _add_paths(work_dir: str, env: dict, paths: List[str]):
+    """
+    只把指定路径的变化同步到快照索引，不遍历工作目录
+    文件用 update-index 逐个处理；新目录用 add -A；已删除的目录展开为索引中的文件
+    """
+    git = ["--literal-pathspecs", f"--work-tree={work_dir}"]
+    files, dirs, missing = [], [], []
+    for path in paths:
+        full = os.path.join(work_dir, path)
+        if os.path.isdir(full) and not os.path.islink(full):
+            dirs.append(path)
+        elif os.path.lexists(full):
+            files.append(path)
+        else:
+            missing.append(path)
+
+    if missing:
+        # 已删除的路径：可能是文件，也可能是整个目录
+        indexed = (await run_git_async(
+            *git, "ls-files", "-z", "--cached", "--", *missing,
+            cwd=work_dir, env=env, check=True
+        )).stdout.split("\0")[:-1]
+        files.extend(indexed)
+
+    if files or dirs:
+        # 未跟踪且被忽略的路径不加入快照（check-ignore 不输出已跟踪的路径）
+        ignored = set((await run_git_async(
+            f"--work-tree={work_dir}", "check-ignore", "-z", "--stdin",
+            cwd=work_dir, env=env, input="\0".join(files + dirs)
+        )).stdout.split("\0"))
+        files = [p for p in files if p not in ignored]
+        dirs = [p for p in dirs if p not in ignored]
+
+    if files:
+        await run_git_async(
+            *git, "update-index", "--add", "--remove", "--replace", "-z", "--stdin",
+            cwd=work_dir, env=env, input="\0".join(files) + "\0", check=True
+        )
+    if dirs:
+        await run_git_async(
+            *git, "add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul",
+            cwd=work_dir, env=env, input="\0".join(dirs), check=True
+        )
+
+async def _snapshot_env(work_dir: str, state_dir) -> dict:
+    """
+    快照使用的git环境：独立的GIT_DIR（git-go/snapshot，只存放索引），
+    对象库、配置和 info/exclude 等仍通过 GIT_COMMON_DIR 来自仓库本身。
+    大仓库中每次增量更新只需重写很小的拆分索引；拆分索引的 sharedindex.* 文件写在
+    独立的GIT_DIR中（旧文件立即清理），不会散落到用户的.git目录
+    """
+    common_dir = (await run_git_async(
+        "rev-parse", "--git-common-dir", cwd=work_dir, check=True
+    )).stdout.strip()
+    snapshot_dir = state_dir / "snapshot"
+    if not (snapshot_dir / "HEAD").exists():
+        snapshot_dir.mkdir(exist_ok=True)
+        # GIT_DIR 必须有 HEAD 才会被识别为仓库（分支不需要存在）
+        (snapshot_dir / "HEAD").write_text("ref: refs/heads/git-go-snapshot\n")
+
+    legacy_index = state_dir / "snapshot.index"
+    if legacy_index.exists():
+        await _drop_legacy_index(work_dir, legacy_index)
+
+    return dict(
+        os.environ,
+        GIT_DIR=str(snapshot_dir),
+        GIT_COMMON_DIR=str(Path(work_dir, common_dir).resolve()),
+        GIT_INDEX_FILE=str(snapshot_dir / "index"),
+        GIT_CONFIG_COUNT="2",
+        GIT_CONFIG_KEY_0="core.splitIndex", GIT_CONFIG_VALUE_0="true",
+        GIT_CONFIG_KEY_1="splitIndex.sharedIndexExpire", GIT_CONFIG_VALUE_1="now",
+    )
+
+async def _drop_legacy_index(work_dir: str, legacy_index: Path):
+    """旧版本的快照索引（git-go/snapshot.index）把 sharedindex.* 写在.git目录中，一并删除"""
+    shared, user_shared = await gather(
+        run_git_async("rev-parse", "--shared-index-path", cwd=work_dir,
+                      env=dict(os.environ, GIT_INDEX_FILE=str(legacy_index))),
+        run_git_async("rev-parse", "--shared-index-path", cwd=work_dir)
+    )
+    shared_path = shared.stdout.strip()
+    # 用户自己的索引也可能引用同一个文件（内容相同），此时保留
+    if shared.returncode == 0 and shared_path and shared_path != user_shared.stdout.strip():
+        Path(work_dir, shared_path).unlink(missing_ok=True)
+    legacy_index.unlink()
+
+async def build_snapshot_tree(work_dir: str, scope: Optional[str] = None) -> str:
+    """
+    将工作目录的当前内容写成树对象，返回树ID
+    指定scope（子目录）时只扫描该目录，返回该目录的子树（不存在时为空树）
+    使用独立的持久化索引文件，不影响用户的暂存区；
+    未修改的文件依靠索引中的stat信息跳过重新哈希。
+    若后台文件监视（utils.watch）在运行，只处理日志中记录的路径，
+    否则（或日志溢出/过期时）全量扫描工作目录。
+    文件选择与 git add -A 相同，遵循所有忽略规则（各级.gitignore、.git/info/exclude、
+    core.excludesFile）；根目录的.gitignore文件本身不推送。
+    注意：早期基于克隆复制的推送不读取根目录.gitignore，只被根目录规则忽略的文件
+    （如 *.log、/Git-Go/）以前会被推送，现在不会
+    """
+    state_dir = await get_state_dir(work_dir)
+    meta_path = state_dir / "snapshot.json"
+    env = await _snapshot_env(work_dir, state_dir)
+    index_path = Path(env["GIT_INDEX_FILE"])
+    git = [f"--work-tree={work_dir}"]
+
+    synced_with = _synced_with(meta_path)
+    paths = take_journal(state_dir, work_dir, synced_with) if index_path.exists() else None
+    if paths is None and scope:
+        # 只扫描子目录：索引其余部分可能过期，下次不带scope时必须全量扫描
+        discard_journal(state_dir)
+        await run_git_async(
+            "--literal-pathspecs", *git, "add", "-A", "--", scope,
+            cwd=work_dir, env=env, check=True
+        )
+        with open(meta_path, "w") as f:
+            json.dump({"synced_with": None}, f)
+    elif paths is None:
+        # 全量扫描：扫描前清空日志，扫描期间的改动会在下次重放
+        watcher = get_watcher(state_dir, work_dir)
+        discard_journal(state_dir)
+        await run_git_async(*git, "add", "-A", cwd=work_dir, env=env, check=True)
+        await run_git_async(
+            *git, "rm", "--cached", "-q", "--ignore-unmatch", "--", ".gitignore",
+            cwd=work_dir, env=env, check=True
+        )
+        with open(meta_path, "w") as f:
+            json.dump({"synced_with": watcher["started"] if watcher else None}, f)
+    elif paths:
+        try:
+            await _add_paths(work_dir, env, paths)
+        except subprocess.CalledProcessError:
+            # 日志已被取走，下次必须全量扫描
+            meta_path.unlink()
+            raise
+
+    if scope:
+        result = await run_git_async(*git, "write-tree", f"--prefix={scope}/", cwd=work_dir, env=env)
+        # 索引中没有该目录的文件时 write-tree 会失败
+        return result.stdout.strip() if result.returncode == 0 else EMPTY_TREE
+    return (await run_git_async(
+        *git, "write-tree", cwd=work_dir, env=env, check=True
+    )).stdout.strip()
+
+async def snapshot_is_current(work_dir: str) -> bool:
+    """
+    上次生成的快照是否仍与工作目录一致（可直接复用，无需重建）
+    只有后台监视在运行且之后没有记录任何改动时才能确定，其余情况都视为可能过期
+    """
+    state_dir = await get_state_dir(work_dir)
+    return journal_is_clean(state_dir, work_dir, _synced_with(state_dir / "snapshot.json"))
+
+async def resolve_ref(work_dir: str, ref: str) -> Optional[str]:
+    """解析引用为提交ID，不存在则返回None"""
+    result = await run_git_async(
+        "rev-parse", "--verify", "-q", f"{ref}^{{commit}}", cwd=work_dir
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+async def tree_of(work_dir: str, commit: Optional[str]) -> str:
+    """返回提交对应的树ID（无提交时为空树）"""
+    if not commit:
+        return EMPTY_TREE
+    return (await run_git_async(
+        "rev-parse", f"{commit}^{{tree}}", cwd=work_dir, check=True
+    )).stdout.strip()
@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import signal
+import struct
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+from .git_repo import get_state_dir
+from .git_runner import run_git, run_sync
+
+# inotify 事件常量（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+# 日志中表示"事件丢失，需要全量扫描"的标记
+OVERFLOW_MARK = "!overflow"
+# 日志中表示仓库的 info/exclude 被修改（不是工作目录中的文件）
+EXCLUDE_PATH = ".git/info/exclude"
+
+def _is_ignore_rule(path: str) -> bool:
+    """该路径的改动会改变忽略规则（任意层级的.gitignore或info/exclude）"""
+    return path == EXCLUDE_PATH or path.rsplit("/", 1)[-1] == ".gitignore"
+
+def _state_files(state_dir: Path):
+    return state_dir / "watch.json", state_dir / "journal"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def get_watcher(state_dir: Path, work_dir: str) -> Optional[dict]:
+    """返回正在监视该工作目录的后台进程信息，没有则返回None"""
+    info_path, _ = _state_files(state_dir)
+    try:
+        with open(info_path) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if info.get("work_dir") != os.path.abspath(work_dir) or not _pid_alive(info["pid"]):
+        return None
+    return info
+
+def discard_journal(state_dir: Path):
+    """清空变更日志（全量扫描前调用）"""
+    _, journal = _state_files(state_dir)
+    try:
+        journal.unlink()
+    except FileNotFoundError:
+        pass
+
+def _journal_trusted(state_dir: Path, work_dir: str, synced_with: Optional[float]) -> bool:
+    """监视进程在运行，且与上次全量扫描时是同一个进程"""
+    watcher = get_watcher(state_dir, work_dir)
+    return watcher is not None and synced_with is not None and watcher["started"] == synced_with
+
+def journal_is_clean(state_dir: Path, work_dir: str, synced_with: Optional[float]) -> bool:
+    """日志可信且自上次快照以来没有记录任何改动"""
+    if not _journal_trusted(state_dir, work_dir, synced_with):
+        return False
+    _, journal = _state_files(state_dir)
+    try:
+        return journal.stat().st_size == 0
+    except FileNotFoundError:
+        return True
+
+def take_journal(state_dir: Path, work_dir: str, synced_with: Optional[float]) -> Optional[List[str]]:
+    """
+    取出自上次快照以来被改动的路径并清空日志
+    synced_with: 上次全量扫描时监视进程的启动时间
+    日志不可信（监视进程未运行/已重启/事件溢出）或忽略规则有变化时返回None，
+    调用方应全量扫描（规则变化会影响未出现在日志中的文件）
+    """
+    if not _journal_trusted(state_dir, work_dir, synced_with):
+        return None
+
+    _, journal = _state_files(state_dir)
+    taken = journal.with_name(f"journal.{os.getpid()}")
+    try:
+        # 先改名再读取，监视进程之后的写入会进入新文件
+        os.replace(journal, taken)
+    except FileNotFoundError:
+        return []
+    try:
+        with open(taken, encoding="utf-8", errors="surrogateescape") as f:
+            lines = f.read().splitlines()
+    finally:
+        taken.unlink()
+
+    if OVERFLOW_MARK in lines or any(_is_ignore_rule(line) for line in lines):
+        return None
+    return list(dict.fromkeys(line for line in lines if line))
+
+
+class InotifyWatcher:
+    """基于Linux inotify的工作目录监视器，把改动过的路径追加到日志"""
+
+    def __init__(self, work_dir: str):
+        self.work_dir = os.path.abspath(work_dir)
+        self.state_dir = run_sync(get_state_dir(self.work_dir))
+        self.info_path, self.journal = _state_files(self.state_dir)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.dirs: Dict[int, str] = {}  # 监视描述符 -> 相对目录
+        self.info_wd = -1                # 仓库 info 目录（其中的 exclude 文件）
+
+    def _ignored_dirs(self) -> set:
+        """被.gitignore忽略的目录（如node_modules）不需要监视"""
+        result = run_git(
+            "ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory",
+            cwd=self.work_dir
+        )
+        return {p.rstrip("/") for p in result.stdout.split("\0") if p.endswith("/")}
+
+    def _add_tree(self, rel_dir: str, ignored: set = frozenset()):
+        """递归监视目录（跳过.git和被忽略的目录）"""
+        for root, dirs, _ in os.walk(os.path.join(self.work_dir, rel_dir)):
+            rel_root = os.path.relpath(root, self.work_dir)
+            rel_root = "" if rel_root == "." else rel_root.replace(os.sep, "/")
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"无法监视目录 {root}（可调大 fs.inotify.max_user_watches）")
+            self.dirs[wd] = rel_root
+            dirs[:] = [
+                d for d in dirs
+                if d != ".git" and f"{rel_root}/{d}".lstrip("/") not in ignored
+            ]
+
+    def _record(self, paths: List[str]):
+        # 每批事件单独打开，日志被取走（改名）后自动写入新文件
+        with open(self.journal, "a", encoding="utf-8", errors="surrogateescape") as f:
+            f.write("".join(f"{p}\n" for p in paths))
+
+    def _watch_info_dir(self):
+        """.git目录本身不监视，只单独监视 info/exclude 的改动"""
+        info_dir = self.state_dir.parent / "info"
+        if info_dir.is_dir():
+            self.info_wd = self.libc.inotify_add_watch(self.fd, os.fsencode(info_dir), WATCH_MASK)
+
+    def run(self):
+        """开始监视（阻塞），退出时清理状态文件"""
+        self._add_tree("", self._ignored_dirs())
+        self._watch_info_dir()
+        discard_journal(self.state_dir)
+        with open(self.info_path, "w") as f:
+            json.dump({"pid": os.getpid(), "work_dir": self.work_dir, "started": time.time()}, f)
+        print(f"👀 正在监视 {self.work_dir} ({len(self.dirs)} 个目录)")
+
+        try:
+            while True:
+                data = os.read(self.fd, 256 * 1024)
+                paths = []
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+                    offset += name_len
+
+                    if mask & IN_Q_OVERFLOW:
+                        paths.append(OVERFLOW_MARK)
+                        continue
+                    if mask & IN_IGNORED:
+                        self.dirs.pop(wd, None)
+                        continue
+                    if wd == self.info_wd:
+                        if name == "exclude":
+                            paths.append(EXCLUDE_PATH)
+                        continue
+                    parent = self.dirs.get(wd)
+                    if parent is None or not name or (parent == "" and name == ".git"):
+                        continue
+
+                    rel = f"{parent}/{name}" if parent else name
+                    paths.append(rel)
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(rel)
+                if paths:
+                    self._record(paths)
+                if any(_is_ignore_rule(p) for p in paths):
+                    # 忽略规则变了：补上之前因被忽略而没有监视的目录
+                    self._add_tree("", self._ignored_dirs())
+        finally:
+            os.close(self.fd)
+            info = get_watcher(self.state_dir, self.work_dir)
+            if info and info["pid"] == os.getpid():
+                self.info_path.unlink()
+
+
+def start_watcher(work_dir: str) -> bool:
+    """在后台启动监视进程（已在运行则跳过）"""
+    if not sys.platform.startswith("linux"):
+        print("⚠️ 文件监视仅支持Linux，推送将使用全量扫描")
+        return False
+    state_dir = run_sync(get_state_dir(work_dir))
+    if get_watcher(state_dir, work_dir):
+        print("✅ 文件监视已在运行")
+        return True
+
+    package_root = Path(__file__).parent.parent
+    subprocess.Popen(
+        [sys.executable, "-m", "utils.watch", os.path.abspath(work_dir)],
+        cwd=package_root, start_new_session=True,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(50):
+        if get_watcher(state_dir, work_dir):
+            print("✅ 已在后台启动文件监视")
+            return True
+        time.sleep(0.1)
+    print("⚠️ 文件监视启动失败，推送将使用全量扫描")
+    return False
+
+
+def watch(work_dir: Optional[str] = None):
+    """前台运行监视进程，Ctrl+C 或 SIGTERM 结束"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        InotifyWatcher(work_dir or os.getcwd()).run()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ 文件监视失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    watch(sys.argv[1] if len(sys.argv) > 1 else None)